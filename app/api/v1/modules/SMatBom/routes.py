@@ -3,6 +3,7 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
 from . import models, schemas, validations
 from app.core.database import get_db
+from app.core.concurrency import run_db
 from typing import Optional, List
 from .service import MatBOMService
 
@@ -31,9 +32,39 @@ async def create_matbom(
     db: Session = Depends(get_db)
 ):
     try:
-        return MatBOMService.create_matbom(db, validated_data)
+        return await run_db(MatBOMService.create_matbom, db, validated_data)
     except Exception as e:
-        db.rollback()
+        await run_db(db.rollback)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error creating SMatBOM: {str(e)}"
+        )
+
+# CREATE (masivo)
+@router.post(
+    "/bulk",
+    response_model=schemas.SMatBOMBulkResult,
+    status_code=status.HTTP_201_CREATED
+)
+async def create_matbom_bulk(
+    items: List[schemas.SMatBOMCreate],
+    db: Session = Depends(get_db)
+):
+    if not items:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Debe enviar al menos un registro"
+        )
+    # Cada parte y unidad distinta se valida una sola vez
+    for numparte in sorted({value for item in items for value in (item.NUMPARTE, item.NUMPARTEBOM) if value}):
+        await validations.validate_numparte_exists(db, numparte)
+    for unimed in sorted({value for item in items for value in (item.UNIMED, item.UMEQUIVALENTE) if value}):
+        await validations.validate_unimed_exists(db, unimed)
+    try:
+        consecutivos = await run_db(MatBOMService.create_matbom_bulk, db, items)
+        return {"created": len(consecutivos), "consecutivos": consecutivos}
+    except Exception as e:
+        await run_db(db.rollback)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error creating SMatBOM: {str(e)}"
@@ -58,7 +89,8 @@ async def search_matbom(
     db: Session = Depends(get_db)
 ):
     try:
-        return MatBOMService.get_matbom(
+        return await run_db(
+            MatBOMService.get_matbom,
             db,
             consecutivo=consecutivo,
             numparte=numparte,
@@ -84,11 +116,11 @@ async def update_matbom(
     try:
         # Validar datos de entrada
         await validate_matbom_data(matbom_update, db)
-        return MatBOMService.update_matbom(db, consecutivo, matbom_update)
+        return await run_db(MatBOMService.update_matbom, db, consecutivo, matbom_update)
     except HTTPException as he:
         raise he
     except Exception as e:
-        db.rollback()
+        await run_db(db.rollback)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error updating SMatBOM: {str(e)}"
@@ -98,11 +130,11 @@ async def update_matbom(
 @router.delete("/{consecutivo}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_matbom(consecutivo: int, db: Session = Depends(get_db)):
     try:
-        MatBOMService.delete_matbom(db, consecutivo)
+        await run_db(MatBOMService.delete_matbom, db, consecutivo)
     except HTTPException as he:
         raise he
     except Exception as e:
-        db.rollback()
+        await run_db(db.rollback)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error deleting SMatBOM: {str(e)}"
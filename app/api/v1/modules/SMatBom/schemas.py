@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 from decimal import Decimal
 
@@ -36,4 +36,9 @@ class SMatBOM(SMatBOMBase):
     CONSECUTIVO: int
     
     class Config:
-        from_attributes = True  # Esto permite la conversión desde ORM (antes 'orm_mode')
\ No newline at end of file
+        from_attributes = True  # Esto permite la conversión desde ORM (antes 'orm_mode')
+
+# Resultado del alta masiva (CONSECUTIVO asignado a cada registro, en el orden recibido)
+class SMatBOMBulkResult(BaseModel):
+    created: int
+    consecutivos: List[int]
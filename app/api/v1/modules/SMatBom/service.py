@@ -3,12 +3,13 @@ from .models import SMatBOM
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from .models import SMatBOM
+from app.core.id_allocator import get_id_allocator
+
+# CONSECUTIVO en bloques hi/lo desde id_counter (sin SELECT MAX + 1 por alta)
+consecutivo_allocator = get_id_allocator(SMatBOM.CONSECUTIVO)
 
 def get_next_consecutivo(db: Session) -> int:
-    # Buscar el máximo CONSECUTIVO actual
-    max_consecutivo = db.query(func.max(SMatBOM.CONSECUTIVO)).scalar()
-    # Si no hay registros, empezar en 1
-    return max_consecutivo + 1 if max_consecutivo is not None else 1
+    return consecutivo_allocator.next_id()
 
 
 
@@ -16,14 +17,13 @@ def get_next_consecutivo(db: Session) -> int:
 from sqlalchemy.orm import Session
 from . import models
 from .schemas import SMatBOMCreate, SMatBOMUpdate
-from sqlalchemy import func
+from sqlalchemy import func, insert
 from fastapi import HTTPException, status
 
 class MatBOMService:
     @staticmethod
     def get_next_consecutivo(db: Session) -> int:
-        max_consecutivo = db.query(func.max(models.SMatBOM.CONSECUTIVO)).scalar()
-        return max_consecutivo + 1 if max_consecutivo is not None else 1
+        return consecutivo_allocator.next_id()
 
     @staticmethod
     def create_matbom(db: Session, data: SMatBOMCreate):
@@ -34,6 +34,18 @@ class MatBOMService:
         db.refresh(db_matbom)
         return db_matbom
 
+    @staticmethod
+    def create_matbom_bulk(db: Session, items: List[SMatBOMCreate]) -> List[int]:
+        """Alta masiva: todos los CONSECUTIVO en una sola reserva y un INSERT executemany"""
+        consecutivos = consecutivo_allocator.next_ids(len(items))
+        rows = [
+            {"CONSECUTIVO": consecutivo, **item.model_dump()}
+            for consecutivo, item in zip(consecutivos, items)
+        ]
+        db.execute(insert(models.SMatBOM), rows)
+        db.commit()
+        return consecutivos
+
     @staticmethod
     def get_matbom(
         db: Session,
@@ -1,15 +1,17 @@
 from fastapi import HTTPException, status
 from sqlalchemy.orm import Session
-from sqlalchemy import text
+from app.core.concurrency import run_db
+from app.utils.catalog_cache import CatalogCache, partes_catalog, unimed_catalog
+
+async def _exists(catalog: CatalogCache, db: Session, key: str) -> bool:
+    # Acierto en memoria sin salir del event loop; carga, refresco o confirmación en un hilo
+    if catalog.contains(key):
+        return True
+    return await run_db(catalog.exists, db, key)
 
 async def validate_numparte_exists(db: Session, numparte: str):
     if numparte:
-        result = db.execute(text(
-            "SELECT COUNT(*) AS cantidad FROM SPartes WHERE NUMPARTE = :numparte"), 
-            {"numparte": numparte}
-        )
-        count = result.scalar()
-        if count == 0:
+        if not await _exists(partes_catalog, db, numparte):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"El NUMPARTE {numparte} no existe en el catálogo de partes."
@@ -17,13 +19,8 @@ async def validate_numparte_exists(db: Session, numparte: str):
 
 async def validate_unimed_exists(db: Session, unimed: str):
     if unimed:
-        result = db.execute(text(
-            "SELECT COUNT(*) AS cantidad FROM GUniMedida WHERE ClaveUni = :unimed"), 
-            {"unimed": unimed}
-        )
-        count = result.scalar()
-        if count == 0:
+        if not await _exists(unimed_catalog, db, unimed):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"La unidad de medida {unimed} no existe en el catálogo."
-            )
\ No newline at end of file
+            )
@@ -1,12 +1,13 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status, Response
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status, Response
 from sqlalchemy.orm import Session
 from app.core.database import get_db
 from .service import spartes_service
 from .schemas import SPartes, SPartesCreate, SPartesUpdate
 from .enmus import SPartesOrderBy
+from app.utils.helpers import decode_cursor, encode_cursor
 from app.utils.responses import (
-    paginated_response, success_response, error_response,
+    paginated_response, success_response, error_response, encoded_response,
     PaginatedResponse, CreateResponse, UpdateResponse, DeleteResponse, ErrorResponse
 )
 
@@ -28,36 +29,49 @@ def read_numparte(
     limit: int = 100,
     order_by: SPartesOrderBy = SPartesOrderBy.NUMPARTE,
     numero_parte: str = None,  # Parámetro opcional para buscar parte específico
+    after: Optional[str] = Query(None, description="nextCursor de la página anterior (paginación keyset)"),
+    include_total: bool = Query(True, description="Incluir totalRecords (conteo cacheado)"),
     db: Session = Depends(get_db),
     response: Response = Response()
 ):
     """Obtener numeros de parte con filtros opcionales"""
     try:
-        partes = spartes_service.get(
-            db, 
-            numero_parte=numero_parte,
-            skip=skip, 
-            limit=limit, 
-            order_by=order_by.value,
-        )
-        
-        if numero_parte and not partes:
-            response.status_code = status.HTTP_404_NOT_FOUND
-            return error_response(message="Parte no encontrada")
+        if numero_parte:
+            partes = spartes_service.get(db, numero_parte=numero_parte)
+            if not partes:
+                response.status_code = status.HTTP_404_NOT_FOUND
+                return error_response(message="Parte no encontrada")
+            return paginated_response(
+                data=[SPartes.model_validate(parte) for parte in partes],
+                total_records=len(partes),
+                message="Partes obtenidas exitosamente"
+            )
         
-        # Obtener el total de registros para paginación
-        total_count = spartes_service.count_all(db, numero_parte=numero_parte)
-        has_more = (skip + limit) < total_count
+        # Keyset sobre Partes_PKNumParte: latencia constante sin importar la profundidad.
+        # skip se conserva (OFFSET) para clientes que aún no usan el cursor
+        try:
+            last_numparte = decode_cursor(after) if after is not None else None
+        except ValueError:
+            last_numparte = None
+        if after is not None and not isinstance(last_numparte, str):
+            response.status_code = status.HTTP_400_BAD_REQUEST
+            return error_response(message="Cursor inválido")
+        rows, has_more = spartes_service.get_page(
+            db, after=last_numparte, limit=limit, skip=0 if after is not None else skip
+        )
         
-        # Convertir datos a esquemas Pydantic
-        partes_schema = [SPartes.model_validate(parte) for parte in partes]
+        next_cursor = encode_cursor(rows[-1]["NUMPARTE"]) if has_more else None
+        # El total es opcional y sale de caché: no se ejecuta un COUNT(*) por página
+        total_count = spartes_service.cached_count(db) if include_total else None
         
-        return paginated_response(
-            data=partes_schema,
+        # Filas Core directo a JSON: sin model_validate por fila ni segunda pasada de response_model
+        return encoded_response(paginated_response(
+            data=[dict(row) for row in rows],
             total_records=total_count,
             has_more=has_more,
+            next_cursor=next_cursor,
             message="Partes obtenidas exitosamente"
-        )
+        ))
     except Exception as e:
         response.status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
         return error_response(message=f"Error al obtener partes: {str(e)}")
@@ -1,9 +1,15 @@
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import func, select
+from sqlalchemy import RowMapping, func, select
+from app.core.config import settings
+from app.utils.cache import TTLCache
+from app.utils.catalog_cache import partes_catalog
 from .models import SPartes
 from .schemas import SPartesCreate, SPartesUpdate
 
+# Total de SPartes compartido entre páginas: evita un COUNT(*) completo por request
+_count_cache = TTLCache(settings.SPARTES_COUNT_CACHE_SECONDS, max_size=1)
+
 class SPartesService:
     # Campos válidos para ordenamiento basados en el modelo
     VALID_ORDER_FIELDS = ["NUMPARTE", "NOMBRE", "NIVELSEG", "PUESTO", "LOGIN"]
@@ -30,31 +36,53 @@ class SPartesService:
         
         return db.scalars(query).all()
     
+    def get_page(self, db: Session, after: Optional[str] = None, limit: int = 100, skip: int = 0) -> Tuple[List[RowMapping], bool]:
+        """
+        Página ordenada por Partes_PKNumParte como filas Core (sin instanciar objetos ORM):
+        keyset con NUMPARTE > after, u OFFSET si se indica skip. Lee limit + 1 para saber si hay más.
+        """
+        query = select(*SPartes.__table__.columns)
+        if after is not None:
+            query = query.where(SPartes.NUMPARTE > after)
+        query = query.order_by(SPartes.NUMPARTE)
+        if skip:
+            query = query.offset(skip)
+        rows = db.execute(query.limit(limit + 1)).mappings().all()
+        return rows[:limit], len(rows) > limit
+    
     def create(self, db: Session, obj_in: SPartesCreate) -> SPartes:
         """Crear un nuevo numero de parte"""
         db_obj = SPartes(**obj_in.model_dump())
         db.add(db_obj)
         db.commit()
         db.refresh(db_obj)
+        _count_cache.invalidate()
+        partes_catalog.add(db_obj.NUMPARTE)
         return db_obj
     
     def update(self, db: Session, db_obj: SPartes, obj_in: SPartesUpdate) -> SPartes:
         """Actualizar un numero de parte existente"""
+        previous_numparte = db_obj.NUMPARTE
         update_data = obj_in.model_dump(exclude_unset=True)
         for field, value in update_data.items():
             setattr(db_obj, field, value)
         db.add(db_obj)
         db.commit()
         db.refresh(db_obj)
+        if db_obj.NUMPARTE != previous_numparte:
+            partes_catalog.discard(previous_numparte)
+            partes_catalog.add(db_obj.NUMPARTE)
         return db_obj
     
     def delete(self, db: Session, numero_parte: str) -> Optional[SPartes]:
         """Eliminar un numero de parte"""
         partes = self.get(db, numero_parte=numero_parte)
-        if numero_parte:
-            db_obj = numero_parte[0]  # Tomar el primer resultado
+        if partes:
+            db_obj = partes[0]  # Tomar el primer resultado
             db.delete(db_obj)
             db.commit()
+            _count_cache.invalidate()
+            partes_catalog.discard(numero_parte)
             return db_obj
         return None
     def count_all(self, db: Session, numero_parte: str = None) -> int:
@@ -65,5 +93,13 @@ class SPartesService:
             query = query.where(SPartes.NUMPARTE == numero_parte)
             
         return db.scalar(query)
+    
+    def cached_count(self, db: Session) -> int:
+        """Total de partes desde caché (SPARTES_COUNT_CACHE_SECONDS o hasta la siguiente alta/baja)"""
+        total = _count_cache.get("total")
+        if total is None:
+            total = self.count_all(db)
+            _count_cache.set("total", total)
+        return total
 # Instancia del CRUD
 spartes_service = SPartesService()
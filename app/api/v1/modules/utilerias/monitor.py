@@ -1,15 +1,209 @@
 # app/api/v1/endpoints/monitor.py
-from fastapi import APIRouter, HTTPException
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from celery.result import AsyncResult
+from redis import asyncio as aioredis
+from sqlalchemy import BigInteger, and_, cast, func, literal_column, or_, select, text
 from app.core.celery import celery_app
-from app.schemas.task import TaskStatusResponse
+from app.core.config import settings
+from app.schemas.task import TaskListResponse, TaskStatusResponse
 from app.core.database import SessionLocal
 from app.models.task import TaskStatus
+from app.utils.cache import TTLCache
+from app.utils.helpers import decode_cursor, encode_cursor
+from app.worker.progress_events import progress_channel
 
 router = APIRouter()
 
+# Respuestas recientes de /tasks/{task_id}: varios dashboards consultando cada segundo
+# comparten una lectura de BD + Celery por vigencia
+_status_cache = TTLCache(settings.TASK_STATUS_CACHE_SECONDS, max_size=4096)
+# Sin eventos en este lapso se envía un comentario para mantener viva la conexión
+STREAM_KEEPALIVE_SECONDS = 15.0
+FINAL_STATES = ("SUCCESS", "FAILURE", "REVOKED")
+
+_redis: Optional[aioredis.Redis] = None
+
+
+def _get_redis() -> aioredis.Redis:
+    global _redis
+    if _redis is None:
+        _redis = aioredis.Redis.from_url(settings.REDIS_URL)
+    return _redis
+
+
+# Tareas cuyo request incluye la tabla (origen o destino)
+TABLE_FILTER = text("""
+EXISTS (
+    SELECT 1 FROM OPENJSON(task_status.request_config, '$.tables')
+    WITH (source_table NVARCHAR(256) '$.source_table', target_table NVARCHAR(256) '$.target_table') AS t
+    WHERE t.source_table = :table_name OR t.target_table = :table_name
+)
+""")
+
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    """Percentil con interpolación lineal (mismo criterio que PERCENTILE_CONT)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return round(ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower), 3)
+
+
+def _table_durations(result: Optional[Dict]) -> List[float]:
+    """Segundos por tabla según table_details del resultado final"""
+    durations = []
+    for details in ((result or {}).get("table_details") or {}).values():
+        try:
+            start = datetime.fromisoformat(details["start_time"])
+            end = datetime.fromisoformat(details["end_time"])
+        except (KeyError, TypeError, ValueError):
+            continue
+        durations.append((end - start).total_seconds())
+    return durations
+
+
+def _task_filters(status: Optional[str], created_from: Optional[datetime],
+                  created_to: Optional[datetime], table: Optional[str]) -> List[Any]:
+    filters = []
+    if status:
+        filters.append(TaskStatus.status.in_([value.strip().upper() for value in status.split(",") if value.strip()]))
+    if created_from:
+        filters.append(TaskStatus.created_at >= created_from)
+    if created_to:
+        filters.append(TaskStatus.created_at < created_to)
+    if table:
+        filters.append(TABLE_FILTER.bindparams(table_name=table))
+    return filters
+
+
+def _task_list_item(row) -> Dict[str, Any]:
+    duration = (row.end_time - row.start_time).total_seconds() if row.start_time and row.end_time else None
+    result = row.result or {}
+    transferred = result.get("transferred_rows")
+    table_durations = _table_durations(result)
+    return {
+        "id": row.id,
+        "task_id": row.celery_task_id,
+        "status": row.status,
+        "progress": row.progress,
+        "tables": [t.get("source_table") for t in (row.request_config or {}).get("tables", [])],
+        "created_at": row.created_at,
+        "start_time": row.start_time,
+        "end_time": row.end_time,
+        "duration": duration,
+        "transferred_rows": transferred,
+        "rows_per_sec": round(transferred / duration, 1) if transferred is not None and duration else None,
+        "table_duration_p50": _percentile(table_durations, 0.5),
+        "table_duration_p95": _percentile(table_durations, 0.95),
+    }
+
+
+def _task_summary(db, filters: List[Any]) -> Dict[str, Any]:
+    """Conteo por estado, tasa de fallas, filas/s y percentiles de duración sobre todo el filtro"""
+    seconds = func.DATEDIFF_BIG(literal_column("millisecond"), TaskStatus.start_time, TaskStatus.end_time) / 1000.0
+    rows = cast(func.JSON_VALUE(TaskStatus.result, "$.transferred_rows"), BigInteger)
+    by_status: Dict[str, int] = {}
+    finished_rows = finished_seconds = 0.0
+    for status, jobs, status_rows, status_seconds in db.execute(
+        select(TaskStatus.status, func.count(), func.sum(rows), func.sum(seconds))
+        .where(*filters).group_by(TaskStatus.status)
+    ):
+        # NULL y 'PENDING' llegan como grupos distintos: se suman
+        key = status or "PENDING"
+        by_status[key] = by_status.get(key, 0) + jobs
+        if status in ("SUCCESS", "FAILURE"):
+            finished_rows += status_rows or 0
+            finished_seconds += float(status_seconds or 0)
+
+    finished = (
+        select(seconds.label("seconds"))
+        .where(*filters, TaskStatus.start_time.isnot(None), TaskStatus.end_time.isnot(None))
+        .subquery()
+    )
+    percentiles = db.execute(
+        select(
+            func.PERCENTILE_CONT(literal_column("0.5")).within_group(finished.c.seconds).over(),
+            func.PERCENTILE_CONT(literal_column("0.95")).within_group(finished.c.seconds).over(),
+        ).distinct()
+    ).first()
+
+    completed = by_status.get("SUCCESS", 0) + by_status.get("FAILURE", 0)
+    return {
+        "total_jobs": sum(by_status.values()),
+        "by_status": by_status,
+        "failure_rate": round(by_status.get("FAILURE", 0) / completed, 4) if completed else None,
+        "rows_per_sec": round(finished_rows / finished_seconds, 1) if finished_seconds else None,
+        "duration_p50": round(percentiles[0], 3) if percentiles and percentiles[0] is not None else None,
+        "duration_p95": round(percentiles[1], 3) if percentiles and percentiles[1] is not None else None,
+    }
+
+
+@router.get("/tasks", response_model=TaskListResponse)
+def list_tasks(
+    status: Optional[str] = Query(None, description="Estados separados por coma (SUCCESS,FAILURE,...)"),
+    created_from: Optional[datetime] = Query(None, description="Creadas desde (inclusive)"),
+    created_to: Optional[datetime] = Query(None, description="Creadas antes de (exclusivo)"),
+    table: Optional[str] = Query(None, description="Tabla origen o destino incluida en el request"),
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="next_cursor de la página anterior"),
+):
+    """Listado paginado (más recientes primero) con agregados del filtro en la primera página"""
+    filters = _task_filters(status, created_from, created_to, table)
+    query = select(
+        TaskStatus.id, TaskStatus.celery_task_id, TaskStatus.status, TaskStatus.progress,
+        TaskStatus.request_config, TaskStatus.result, TaskStatus.created_at,
+        TaskStatus.start_time, TaskStatus.end_time,
+    ).where(*filters)
+    if cursor:
+        try:
+            last_created, last_id = decode_cursor(cursor)
+            last_created = datetime.fromisoformat(last_created)
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=400, detail="Cursor inválido")
+        # Keyset sobre (created_at, id) descendente: usa ix_task_status_created_at_id
+        query = query.where(or_(
+            TaskStatus.created_at < last_created,
+            and_(TaskStatus.created_at == last_created, TaskStatus.id < last_id),
+        ))
+    query = query.order_by(TaskStatus.created_at.desc(), TaskStatus.id.desc()).limit(limit + 1)
+
+    db = SessionLocal()
+    try:
+        rows = db.execute(query).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = encode_cursor([rows[-1].created_at, rows[-1].id]) if has_more else None
+        return {
+            "items": [_task_list_item(row) for row in rows],
+            "next_cursor": next_cursor,
+            "summary": _task_summary(db, filters) if cursor is None else None,
+        }
+    finally:
+        db.close()
+
+
 @router.get("/tasks/{task_id}", response_model=TaskStatusResponse)
 def get_task_status(task_id: str):
+    cached = _status_cache.get(task_id)
+    if cached is not None:
+        return cached
+    response = build_task_status(task_id)
+    _status_cache.set(task_id, response)
+    return response
+
+
+def build_task_status(task_id: str) -> Dict[str, Any]:
+    """Estado combinado de Celery y task_status (sin caché)"""
     # Obtener estado de Celery
     celery_task = AsyncResult(task_id, app=celery_app)
     
@@ -20,36 +214,111 @@ def get_task_status(task_id: str):
         if not task_record:
             raise HTTPException(status_code=404, detail="Tarea no encontrada")
         
+        # Celery reporta PENDING para ids desconocidos (p. ej. resultado expirado en Redis):
+        # en ese caso manda el estado que el worker guardó en task_status
+        status = celery_task.status
+        if status == "PENDING" and task_record.status not in (None, "PENDING"):
+            status = task_record.status
+        
         # Construir respuesta combinada
         response = {
             "task_id": task_id,
-            "status": celery_task.status,
+            "status": status,
             "start_time": task_record.start_time,
             "end_time": task_record.end_time,
             "duration": task_record.duration,
             "warnings": task_record.warnings or []
         }
         
-        if celery_task.status == "PROGRESS":
-            # Usar datos en vivo de Celery
+        if status in ("STARTED", "PROGRESS") and celery_task.status != status:
+            # Último avance persistido por el worker
+            progress_data = task_record.result or {}
+            response.update({
+                "progress": task_record.progress,
+                "table_status": progress_data.get("tables", {})
+            })
+        elif status == "PROGRESS":
+            # Usar datos en vivo de Celery (resumen compacto del ProgressReporter)
             progress_data = celery_task.result
             response.update({
                 "progress": progress_data.get("progress"),
-                "table_status": progress_data.get("stats", {}).get("table_details", {})
+                "table_status": progress_data.get("tables", {})
             })
-        elif celery_task.status == "SUCCESS":
+        elif status == "SUCCESS":
             # Usar datos finales de la base de datos
             response.update({
                 "progress": 100,
                 "result": task_record.result,
                 "table_status": task_record.result.get("table_details", {}) if task_record.result else {}
             })
-        elif celery_task.status == "FAILURE":
+        elif status == "FAILURE":
             response.update({
-                "error": str(celery_task.result),
+                "error": str(celery_task.result) if celery_task.status == "FAILURE" else None,
                 "table_status": task_record.errors
             })
         
+        response["db_task_id"] = task_record.id
         return response
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+def _db_task_id(task_id: str) -> int:
+    """Id del registro task_status de una tarea Celery (404 si no existe)"""
+    db = SessionLocal()
+    try:
+        db_task_id = db.scalar(select(TaskStatus.id).where(TaskStatus.celery_task_id == task_id))
+        if db_task_id is None:
+            raise HTTPException(status_code=404, detail="Tarea no encontrada")
+        return db_task_id
+    finally:
+        db.close()
+
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+
+@router.get("/tasks/{task_id}/stream")
+async def stream_task_status(task_id: str, request: Request):
+    """
+    Server-sent events: un evento 'snapshot' con el estado actual y después 'progress'
+    con los deltas publicados por el worker (solo tablas que cambiaron) hasta 'finished'.
+    """
+    db_task_id = await run_in_threadpool(_db_task_id, task_id)
+    channel = progress_channel(db_task_id)
+
+    async def events():
+        pubsub = _get_redis().pubsub()
+        # Suscribirse antes de leer el snapshot: ningún evento queda entre ambos
+        await pubsub.subscribe(channel)
+        try:
+            snapshot = await run_in_threadpool(build_task_status, task_id)
+            snapshot.pop("db_task_id", None)
+            yield _sse("snapshot", snapshot)
+            if snapshot["status"] in FINAL_STATES:
+                return
+            while not await request.is_disconnected():
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=STREAM_KEEPALIVE_SECONDS)
+                if message is None:
+                    # Sin eventos: confirmar que la tarea no terminó sin publicar 'finished'
+                    current = await run_in_threadpool(get_task_status, task_id)
+                    if current["status"] in FINAL_STATES:
+                        yield _sse("finished", {"status": current["status"]})
+                        return
+                    yield ": keepalive\n\n"
+                    continue
+                payload = json.loads(message["data"])
+                event = payload.pop("event", "progress")
+                yield _sse(event, payload)
+                if event == "finished":
+                    return
+        finally:
+            await pubsub.unsubscribe(channel)
+            await pubsub.aclose()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
\ No newline at end of file
@@ -4,21 +4,44 @@ from app.schemas.transfer import TransferRequest
 from app.schemas.task import TransferTaskResponse
 from app.schemas.test import DatabaseTestRequest
 from app.tasks.transfer_tasks import start_transfer
+from app.tasks.parallel_transfer import execute_parallel_transfer
+from app.tasks.distributed_transfer import start_distributed_transfer
 from app.core.celery import celery_app
+from celery import uuid as celery_uuid
 from app.models.task import TaskStatus
 from sqlalchemy.orm import sessionmaker
 from typing import Dict, Any
 from sqlalchemy.exc import SQLAlchemyError, DBAPIError
-from app.core.database import get_db, create_unified_engine, test_connection, parse_sqlalchemy_error
+from app.core.database import get_db, get_engine, test_connection, parse_sqlalchemy_error
+from app.worker.row_counts import estimate_table_rows
 from datetime import datetime
+from starlette.concurrency import run_in_threadpool
+from app.core.concurrency import run_db
+import asyncio
 import re
 from sqlalchemy.orm import Session
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, or_, text, update
 import logging
 
 logger = logging.getLogger(__name__)
 router = APIRouter(tags=["proceso_51"])
 
+def get_transfer_task(execution_mode: str):
+    """Tarea Celery que ejecuta el modo de transferencia solicitado"""
+    return {
+        "parallel": execute_parallel_transfer,
+        "distributed": start_distributed_transfer,
+    }.get(execution_mode, start_transfer)
+
+def _save_new_record(db: Session, task_record: TaskStatus):
+    db.add(task_record)
+    db.commit()
+    db.refresh(task_record)
+
+def _delete_record(db: Session, task_record: TaskStatus):
+    db.delete(task_record)
+    db.commit()
+
 @router.post("/transfer", response_model=TransferTaskResponse, status_code=202)
 async def create_transfer_task(
     request: TransferRequest,
@@ -34,8 +57,13 @@ async def create_transfer_task(
     # Validar conexiones antes de crear la tarea
     logger.info("Validando conexiones antes de crear tarea...")
     
-    # Probar conexión origen
-    source_test = test_connection(request.source.model_dump())
+    # Probar origen y destino a la vez: cada login ODBC bloquea un hilo, no el event loop
+    source_test, target_test = await asyncio.gather(
+        run_db(test_connection, request.source.model_dump()),
+        run_db(test_connection, request.target.model_dump()),
+    )
+    
+    # Conexión origen
     if not source_test["success"]:
         raise HTTPException(
             status_code=400, 
@@ -46,8 +74,7 @@ async def create_transfer_task(
             }
         )
     
-    # Probar conexión destino
-    target_test = test_connection(request.target.model_dump())
+    # Conexión destino
     if not target_test["success"]:
         raise HTTPException(
             status_code=400, 
@@ -66,18 +93,16 @@ async def create_transfer_task(
         request_config=request.model_dump(),
         created_at=datetime.now()
     )
-    db.add(task_record)
-    db.commit()
-    db.refresh(task_record)
+    await run_db(_save_new_record, db, task_record)
     
     # Iniciar tarea asíncrona con Celery
     try:
-        celery_task = start_transfer.delay(request.model_dump(), task_record.id)
+        transfer_task = get_transfer_task(request.execution_mode)
+        celery_task = await run_in_threadpool(transfer_task.delay, request.model_dump(), task_record.id)
         logger.info(f"Tarea Celery creada: {celery_task.id}")
     except Exception as e:
         logger.error(f"Error iniciando tarea Celery: {str(e)}")
-        db.delete(task_record)
-        db.commit()
+        await run_db(_delete_record, db, task_record)
         raise HTTPException(
             status_code=500,
             detail=f"Error iniciando tarea Celery: {str(e)}"
@@ -85,7 +110,7 @@ async def create_transfer_task(
     
     # Actualizar registro con ID de Celery
     task_record.celery_task_id = celery_task.id
-    db.commit()
+    await run_db(db.commit)
     
     return TransferTaskResponse(
         task_id=celery_task.id,
@@ -95,6 +120,7 @@ async def create_transfer_task(
             "tables_count": len(request.tables),
             "tables": [t.source_table for t in request.tables],
             "chunk_size": request.chunk_size,
+            "execution_mode": request.execution_mode,
             "db_task_id": task_record.id,
             "source_server": f"{request.source.server}:{request.source.port}",
             "target_server": f"{request.target.server}:{request.target.port}"
@@ -102,40 +128,132 @@ async def create_transfer_task(
         created_at=datetime.now()
     )
 
+# Estados de task_status en los que la tarea sigue en cola o corriendo. En Celery solo cuentan
+# STARTED/PROGRESS: PENDING también es el estado de un resultado ya expirado o desconocido
+ACTIVE_TASK_STATES = ("PENDING", "STARTED", "PROGRESS")
+ACTIVE_CELERY_STATES = ("STARTED", "PROGRESS")
+
+
+def _claim_task_record(db: Session, record_id: int, task_id: str, new_task_id: str) -> bool:
+    """Pasa el registro a PENDING con el nuevo id de Celery si sigue apuntando a task_id y no está activo"""
+    result = db.execute(
+        update(TaskStatus)
+        .where(
+            TaskStatus.id == record_id,
+            TaskStatus.celery_task_id == task_id,
+            or_(TaskStatus.status.is_(None), TaskStatus.status.notin_(ACTIVE_TASK_STATES)),
+        )
+        .values(celery_task_id=new_task_id, status="PENDING", end_time=None)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount == 1
+
+
+def _release_task_record(db: Session, record_id: int, new_task_id: str, task_id: str, status: str):
+    """Deshace el reclamo si no se pudo encolar la tarea"""
+    db.execute(
+        update(TaskStatus)
+        .where(TaskStatus.id == record_id, TaskStatus.celery_task_id == new_task_id)
+        .values(celery_task_id=task_id, status=status)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+
+@router.post("/transfer/{task_id}/resume", response_model=TransferTaskResponse, status_code=202)
+async def resume_transfer_task(task_id: str, db: Session = Depends(get_db)):
+    """Reanuda una transferencia interrumpida desde los checkpoints de cada tabla"""
+    task_record = await run_db(
+        lambda: db.query(TaskStatus).filter(TaskStatus.celery_task_id == task_id).first()
+    )
+    if not task_record:
+        raise HTTPException(status_code=404, detail="Tarea no encontrada")
+    
+    celery_state = await run_in_threadpool(lambda: celery_app.AsyncResult(task_id).state)
+    if celery_state in ACTIVE_CELERY_STATES or task_record.status in ACTIVE_TASK_STATES:
+        raise HTTPException(
+            status_code=409,
+            detail=f"La tarea sigue en cola o en ejecución ({task_record.status or celery_state})"
+        )
+    
+    # Reclamo atómico del registro: de dos reanudaciones simultáneas solo una cambia
+    # celery_task_id desde task_id; la otra no actualiza filas y recibe 409
+    new_task_id = celery_uuid()
+    record_id, previous_status = task_record.id, task_record.status
+    # Misma configuración y mismo registro: los checkpoints se buscan por su id
+    transfer_config = {**task_record.request_config, "resume": True}
+    claimed = await run_db(_claim_task_record, db, record_id, task_id, new_task_id)
+    if not claimed:
+        raise HTTPException(status_code=409, detail="La tarea ya se está reanudando")
+    
+    try:
+        transfer_task = get_transfer_task(transfer_config.get("execution_mode", "serial"))
+        celery_task = await run_in_threadpool(
+            transfer_task.apply_async, (transfer_config, record_id), task_id=new_task_id
+        )
+        logger.info(f"Tarea {task_id} reanudada como {celery_task.id}")
+    except Exception as e:
+        logger.error(f"Error reanudando tarea Celery: {str(e)}")
+        # Liberar el registro para poder reintentar la reanudación
+        await run_db(_release_task_record, db, record_id, new_task_id, task_id, previous_status)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error reanudando tarea Celery: {str(e)}"
+        )
+    
+    return TransferTaskResponse(
+        task_id=celery_task.id,
+        status="PENDING",
+        monitor_url=f"/api/v1/tasks/{celery_task.id}",
+        details={
+            "resumed_from": task_id,
+            "tables_count": len(transfer_config["tables"]),
+            "tables": [t["source_table"] for t in transfer_config["tables"]],
+            "execution_mode": transfer_config.get("execution_mode", "serial"),
+            "db_task_id": record_id,
+        },
+        created_at=datetime.now()
+    )
+
+def _run_test_query(request: DatabaseTestRequest):
+    """Ejecuta test_query con el engine registrado y devuelve hasta 100 filas"""
+    # Usar el engine registrado (reutiliza el pool entre pruebas)
+    engine = get_engine(request.model_dump())
+    
+    # Probar con la consulta personalizada
+    test_query = request.test_query
+    
+    # Ejecutar consulta con timeout
+    with engine.connect() as connection:
+        result = connection.execute(text(test_query))
+        
+        # Procesar resultados
+        if result.returns_rows:
+            rows = result.fetchall()
+            columns = list(result.keys())
+            
+            # Convertir a formato JSON (limitar resultados para evitar respuestas muy grandes)
+            result_data = [
+                {column: value for column, value in zip(columns, row)}
+                for row in rows[:100]  # Limitar a 100 filas
+            ]
+            
+            if len(rows) > 100:
+                result_data.append({"_note": f"Se muestran las primeras 100 filas de {len(rows)} total"})
+        else:
+            result_data = {"message": "Query executed successfully", "rows_affected": result.rowcount}
+    return result_data
+
 @router.post("/test-connection")
 async def test_database_connection(request: DatabaseTestRequest):
     """Endpoint mejorado para probar conexión usando la función unificada"""
     try:
         logger.info(f"Probando conexión a {request.server}:{request.port}/{request.database}")
         
-        # Usar función unificada para crear engine
-        engine = create_unified_engine(request.model_dump())
-        
-        # Probar con la consulta personalizada
+        # Consulta de prueba en un hilo del pool de BD (login ODBC y ejecución bloquean)
         test_query = request.test_query
-        
-        # Ejecutar consulta con timeout
-        with engine.connect() as connection:
-            result = connection.execute(text(test_query))
-            
-            # Procesar resultados
-            if result.returns_rows:
-                rows = result.fetchall()
-                columns = list(result.keys())
-                
-                # Convertir a formato JSON (limitar resultados para evitar respuestas muy grandes)
-                result_data = [
-                    {column: value for column, value in zip(columns, row)}
-                    for row in rows[:100]  # Limitar a 100 filas
-                ]
-                
-                if len(rows) > 100:
-                    result_data.append({"_note": f"Se muestran las primeras 100 filas de {len(rows)} total"})
-            else:
-                result_data = {"message": "Query executed successfully", "rows_affected": result.rowcount}
-        
-        # Limpiar recursos
-        engine.dispose()
+        result_data = await run_db(_run_test_query, request)
         
         return {
             "success": True,
@@ -160,6 +278,51 @@ async def test_database_connection(request: DatabaseTestRequest):
             "connection_test": "FAILED"
         })
 
+def _validate_tables(request: TransferRequest) -> list:
+    """Existencia y filas estimadas de cada tabla en origen y destino (bloqueante)"""
+    source_engine = get_engine(request.source.model_dump())
+    target_engine = get_engine(request.target.model_dump())
+    tables_validation = []
+    
+    for table_config in request.tables:
+        table_validation = {
+            "table": table_config.source_table,
+            "exists_in_source": False,
+            "exists_in_target": False,
+            "estimated_rows": 0,
+            "warnings": []
+        }
+        
+        # Verificar existencia en origen (filas desde metadatos; COUNT(*) solo para vistas o count_mode=exact)
+        try:
+            estimated_rows = None
+            if request.count_mode == "auto":
+                estimated_rows = estimate_table_rows(source_engine, table_config.source_table)
+            if estimated_rows is None:
+                with source_engine.connect() as conn:
+                    result = conn.execute(text(f"SELECT COUNT(*) FROM {table_config.source_table}"))
+                    estimated_rows = result.scalar()
+                table_validation["row_count_source"] = "exact"
+            else:
+                table_validation["row_count_source"] = "estimate"
+            table_validation["estimated_rows"] = estimated_rows
+            table_validation["exists_in_source"] = True
+        except Exception as e:
+            table_validation["warnings"].append(f"Error verificando tabla origen: {str(e)}")
+        
+        # Verificar existencia en destino
+        target_table = table_config.target_table or table_config.source_table
+        try:
+            with target_engine.connect() as conn:
+                conn.execute(text(f"SELECT TOP 1 * FROM {target_table}"))
+                table_validation["exists_in_target"] = True
+        except Exception as e:
+            table_validation["warnings"].append(f"Tabla destino podría no existir: {str(e)}")
+        
+        tables_validation.append(table_validation)
+    
+    return tables_validation
+
 @router.post("/validate-transfer-config")
 async def validate_transfer_config(request: TransferRequest):
     """Validar configuración de transferencia sin ejecutarla"""
@@ -173,15 +336,16 @@ async def validate_transfer_config(request: TransferRequest):
             "errors": []
         }
         
-        # Validar conexión origen
-        source_test = test_connection(request.source.model_dump())
+        # Validar conexiones origen y destino en paralelo
+        source_test, target_test = await asyncio.gather(
+            run_db(test_connection, request.source.model_dump()),
+            run_db(test_connection, request.target.model_dump()),
+        )
         validation_results["source_connection"] = source_test
         if not source_test["success"]:
             validation_results["valid"] = False
             validation_results["errors"].append(f"Conexión origen falló: {source_test['error']['message']}")
         
-        # Validar conexión destino
-        target_test = test_connection(request.target.model_dump())
         validation_results["target_connection"] = target_test
         if not target_test["success"]:
             validation_results["valid"] = False
@@ -189,42 +353,7 @@ async def validate_transfer_config(request: TransferRequest):
         
         # Si las conexiones funcionan, validar tablas
         if source_test["success"] and target_test["success"]:
-            source_engine = create_unified_engine(request.source.model_dump())
-            target_engine = create_unified_engine(request.target.model_dump())
-            
-            try:
-                for table_config in request.tables:
-                    table_validation = {
-                        "table": table_config.source_table,
-                        "exists_in_source": False,
-                        "exists_in_target": False,
-                        "estimated_rows": 0,
-                        "warnings": []
-                    }
-                    
-                    # Verificar existencia en origen
-                    try:
-                        with source_engine.connect() as conn:
-                            result = conn.execute(text(f"SELECT COUNT(*) FROM {table_config.source_table}"))
-                            table_validation["estimated_rows"] = result.scalar()
-                            table_validation["exists_in_source"] = True
-                    except Exception as e:
-                        table_validation["warnings"].append(f"Error verificando tabla origen: {str(e)}")
-                    
-                    # Verificar existencia en destino
-                    target_table = table_config.target_table or table_config.source_table
-                    try:
-                        with target_engine.connect() as conn:
-                            conn.execute(text(f"SELECT TOP 1 * FROM {target_table}"))
-                            table_validation["exists_in_target"] = True
-                    except Exception as e:
-                        table_validation["warnings"].append(f"Tabla destino podría no existir: {str(e)}")
-                    
-                    validation_results["tables_validation"].append(table_validation)
-                
-            finally:
-                source_engine.dispose()
-                target_engine.dispose()
+            validation_results["tables_validation"] = await run_db(_validate_tables, request)
         
         return validation_results
         
@@ -263,7 +392,7 @@ async def connection_diagnostics():
             common_ports = [1433, 1434]
             for port in common_ports:
                 try:
-                    sock = socket.create_connection(("host.docker.internal", port), timeout=5)
+                    sock = await run_in_threadpool(socket.create_connection, ("host.docker.internal", port), timeout=5)
                     sock.close()
                     diagnostics["network_tests"][f"port_{port}"] = "OPEN"
                 except:
@@ -5,7 +5,7 @@ celery_app = Celery(
     __name__,
     broker=settings.CELERY_BROKER_URL,
     backend=settings.CELERY_RESULT_BACKEND,
-    include=["app.tasks.transfer_tasks"]
+    include=["app.tasks.transfer_tasks", "app.tasks.parallel_transfer", "app.tasks.distributed_transfer"]
 )
 
 celery_app.conf.update(
@@ -13,5 +13,7 @@ celery_app.conf.update(
     result_serializer='json',
     accept_content=['json'],
     worker_prefetch_multiplier=1,
-    task_acks_late=True
+    task_acks_late=True,
+    # Subtareas de transferencias distribuidas: las consume cualquier worker de la cola
+    task_routes={"distributed_transfer.*": {"queue": "transfers"}}
 )
\ No newline at end of file
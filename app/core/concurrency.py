@@ -0,0 +1,28 @@
+# app/core/concurrency.py
+from functools import partial
+from typing import Any, Callable, Optional, TypeVar
+
+from anyio import CapacityLimiter, to_thread
+
+from app.core.config import settings
+
+T = TypeVar("T")
+
+_db_limiter: Optional[CapacityLimiter] = None
+
+
+def db_limiter() -> CapacityLimiter:
+    """Limitador de hilos para trabajo de BD (se crea dentro del event loop en el primer uso)"""
+    global _db_limiter
+    if _db_limiter is None:
+        _db_limiter = CapacityLimiter(settings.DB_THREADPOOL_SIZE)
+    return _db_limiter
+
+
+async def run_db(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Ejecuta una llamada síncrona de BD (Session, engine, pyodbc) en un hilo del pool acotado
+    para no bloquear el event loop. Con más hilos que conexiones del pool solo se
+    acumularían esperas en el checkout, por eso el límite sigue a pool_size + max_overflow.
+    """
+    return await to_thread.run_sync(partial(func, *args, **kwargs), limiter=db_limiter())
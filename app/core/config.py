@@ -9,6 +9,8 @@ class Settings(BaseSettings):
     # Conexión a Redis en Docker
     CELERY_BROKER_URL: str = "redis://localhost:6379/0"
     CELERY_RESULT_BACKEND: str = "redis://localhost:6379/0"
+    # Pub/sub de progreso para /tasks/{task_id}/stream
+    REDIS_URL: str = "redis://localhost:6379/0"
     
     # URL base para el worker (usar host.docker.internal en Docker)
     API_BASE_URL: str = "http://localhost:8000"
@@ -19,6 +21,27 @@ class Settings(BaseSettings):
     CELERY_QUEUES: str = "transfers,monitoring"
     CELERY_WORKER_PREFIX: str = "db_worker"
     CELERY_LOG_LEVEL: str = "INFO"
+    # Registro de engines por proceso (pools reutilizados entre transferencias)
+    ENGINE_REGISTRY_MAX_SIZE: int = 16
+    ENGINE_IDLE_TIMEOUT_SECONDS: int = 900
+    # Vigencia de la caché de metadatos de tablas (columnas, tipos, llaves)
+    SCHEMA_CACHE_TTL_SECONDS: int = 300
+    # Progreso publicado como máximo cada N segundos, o antes si avanza M puntos
+    PROGRESS_MIN_INTERVAL_SECONDS: float = 2.0
+    PROGRESS_MIN_DELTA_PERCENT: float = 5.0
+    # Escrituras de progreso en task_status como máximo cada N segundos
+    STATUS_FLUSH_INTERVAL_SECONDS: float = 10.0
+    # Vigencia de las respuestas cacheadas de /tasks/{task_id} (consultas repetidas de dashboards)
+    TASK_STATUS_CACHE_SECONDS: float = 1.0
+    # Vigencia del total de registros de /spartes (también se invalida al escribir)
+    SPARTES_COUNT_CACHE_SECONDS: int = 60
+    # Hilos para llamadas de BD desde handlers async (pool_size + max_overflow del engine principal)
+    DB_THREADPOOL_SIZE: int = 15
+    # Ids reservados por viaje a id_counter (CONSECUTIVO de SMatBOM y similares)
+    ID_BLOCK_SIZE: int = 100
+    # Catálogos en memoria para validaciones: altas recientes cada N segundos, recarga completa cada M
+    CATALOG_REFRESH_SECONDS: int = 60
+    CATALOG_RELOAD_SECONDS: int = 3600
     class Config:
         env_file = ".env"
 
@@ -153,8 +153,13 @@ from sqlalchemy import create_engine, exc, event, text
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
 from typing import Dict, Any
-from sqlalchemy.engine import URL
+from collections import OrderedDict
+from sqlalchemy.engine import URL, Engine
+import hashlib
 import logging
+import os
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
@@ -165,6 +170,12 @@ connection_string = (
 engine = create_engine(connection_string,pool_size=5,max_overflow=10,pool_pre_ping=True)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Pool propio para que los workers escriban task_status sin competir con la API ni con las transferencias
+status_engine = create_engine(
+    connection_string, pool_size=1, max_overflow=2, pool_pre_ping=True, pool_recycle=3600
+)
+StatusSessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=status_engine)
+
 def get_db():
     """Dependencia para obtener la sesión de base de datos"""
     db = SessionLocal()
@@ -173,9 +184,67 @@ def get_db():
     finally:
         db.close()
 
-def create_unified_engine(db_config: Dict) -> create_engine:
+# Tablas auxiliares del worker creadas en este proceso
+_ensured_tables = set()
+_ensured_tables_lock = threading.Lock()
+
+def ensure_table(model, bind=None):
+    """Crea la tabla de un modelo (checkfirst) la primera vez que se usa en el proceso"""
+    table = model.__table__
+    if table.name in _ensured_tables:
+        return
+    with _ensured_tables_lock:
+        if table.name not in _ensured_tables:
+            table.create(bind=bind or engine, checkfirst=True)
+            _ensured_tables.add(table.name)
+
+# Ajustes idempotentes a task_status (tablas creadas antes de user-019): status y celery_task_id
+# eran VARCHAR(max), que no puede ser llave de índice, y faltaban los índices de búsqueda y /tasks
+TASK_STATUS_MIGRATIONS = [
+    """
+    IF EXISTS (SELECT 1 FROM sys.columns
+               WHERE object_id = OBJECT_ID('task_status') AND name = 'celery_task_id' AND max_length = -1)
+        ALTER TABLE task_status ALTER COLUMN celery_task_id VARCHAR(50) NULL
+    """,
+    """
+    IF NOT EXISTS (SELECT 1 FROM sys.indexes
+                   WHERE object_id = OBJECT_ID('task_status') AND name = 'ix_task_status_celery_task_id')
+        CREATE INDEX ix_task_status_celery_task_id ON task_status (celery_task_id)
+    """,
+    """
+    IF EXISTS (SELECT 1 FROM sys.columns
+               WHERE object_id = OBJECT_ID('task_status') AND name = 'status' AND max_length = -1)
+        ALTER TABLE task_status ALTER COLUMN status VARCHAR(20) NULL
+    """,
+    """
+    IF NOT EXISTS (SELECT 1 FROM sys.indexes
+                   WHERE object_id = OBJECT_ID('task_status') AND name = 'ix_task_status_status_created_at')
+        CREATE INDEX ix_task_status_status_created_at ON task_status (status, created_at)
+    """,
+    """
+    IF NOT EXISTS (SELECT 1 FROM sys.indexes
+                   WHERE object_id = OBJECT_ID('task_status') AND name = 'ix_task_status_created_at_id')
+        CREATE INDEX ix_task_status_created_at_id ON task_status (created_at, id)
+    """,
+]
+
+def ensure_task_status_schema(bind=None):
+    """Crea task_status si falta y aplica TASK_STATUS_MIGRATIONS (seguro de repetir)"""
+    from app.models.task import TaskStatus
+    bind = bind or engine
+    ensure_table(TaskStatus, bind)
+    if bind.dialect.name != "mssql":
+        return
+    with bind.begin() as conn:
+        for statement in TASK_STATUS_MIGRATIONS:
+            conn.execute(text(statement))
+
+def create_unified_engine(db_config: Dict, pool_size: int = 2, max_overflow: int = 5) -> create_engine:
     """
     Función unificada corregida para problemas ODBC específicos
+    
+    pool_size/max_overflow permiten dimensionar el pool (p. ej. al presupuesto
+    de conexiones de una transferencia paralela)
     """
     try:
         logger.info(f"Creando conexión a: {db_config['server']}:{db_config.get('port', 1433)}/{db_config['database']}")
@@ -206,8 +275,8 @@ def create_unified_engine(db_config: Dict) -> create_engine:
         # Configuración de engine optimizada para evitar problemas de cursor
         engine = create_engine(
             connection_url,
-            pool_size=2,           # Pool más pequeño para evitar problemas
-            max_overflow=5,        # Menos conexiones simultáneas
+            pool_size=pool_size,   # Pool pequeño por defecto para evitar problemas
+            max_overflow=max_overflow,  # Menos conexiones simultáneas
             pool_timeout=120,      # Timeout más largo para obtener conexión
             pool_pre_ping=True,    # Verificar conexiones antes de usar
             pool_recycle=1800,     # Reciclar conexiones cada 30 minutos
@@ -267,6 +336,106 @@ def create_unified_engine(db_config: Dict) -> create_engine:
         logger.error(f"Error creando motor SQLAlchemy: {str(e)}")
         raise ConnectionError(f"Error creando motor: {str(e)}")
 
+# Registro de engines por proceso: reutiliza pools calientes entre transferencias
+_engine_registry: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_engine_registry_lock = threading.Lock()
+
+def engine_registry_key(db_config: Dict, **pool_options) -> str:
+    """Hash de servidor/puerto/base/usuario (y credencial y pool) que identifica un engine"""
+    raw = "|".join([
+        str(db_config["server"]).lower(),
+        str(db_config.get("port", 1433)),
+        str(db_config["database"]).lower(),
+        str(db_config["username"]).lower(),
+        str(db_config["password"]),
+        repr(sorted(pool_options.items())),
+    ])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+def _track_checkouts(engine: Engine, entry: Dict[str, Any]):
+    """Cuenta conexiones prestadas y renueva last_used en cada checkout/checkin del pool"""
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        with _engine_registry_lock:
+            entry["in_use"] += 1
+            entry["last_used"] = time.monotonic()
+
+    def on_checkin(dbapi_connection, connection_record):
+        with _engine_registry_lock:
+            entry["in_use"] = max(entry["in_use"] - 1, 0)
+            entry["last_used"] = time.monotonic()
+
+    event.listen(engine, "checkout", on_checkout)
+    event.listen(engine, "checkin", on_checkin)
+
+def _dispose_idle_engines(now: float):
+    """
+    Libera los engines sin uso por más de ENGINE_IDLE_TIMEOUT_SECONDS (requiere el lock).
+    Un engine con conexiones prestadas nunca se considera inactivo.
+    """
+    idle_keys = [
+        key for key, entry in _engine_registry.items()
+        if not entry["in_use"] and now - entry["last_used"] > settings.ENGINE_IDLE_TIMEOUT_SECONDS
+    ]
+    for key in idle_keys:
+        entry = _engine_registry.pop(key)
+        entry["engine"].dispose()
+        logger.info(f"Engine inactivo liberado: {entry['label']}")
+
+def get_engine(db_config: Dict, **pool_options) -> Engine:
+    """
+    Devuelve el engine registrado para la configuración o lo crea con create_unified_engine.
+    LRU con tamaño máximo ENGINE_REGISTRY_MAX_SIZE; los engines inactivos se liberan.
+    """
+    key = engine_registry_key(db_config, **pool_options)
+    now = time.monotonic()
+    with _engine_registry_lock:
+        _dispose_idle_engines(now)
+        entry = _engine_registry.get(key)
+        if entry is not None:
+            _engine_registry.move_to_end(key)
+            entry["last_used"] = now
+            return entry["engine"]
+
+        engine = create_unified_engine(db_config, **pool_options)
+        entry = _engine_registry[key] = {
+            "engine": engine,
+            "last_used": now,
+            "in_use": 0,
+            "label": f"{db_config['server']}:{db_config.get('port', 1433)}/{db_config['database']}",
+        }
+        _track_checkouts(engine, entry)
+        # LRU: se desalojan primero los más antiguos sin conexiones prestadas
+        overflow = len(_engine_registry) - settings.ENGINE_REGISTRY_MAX_SIZE
+        if overflow > 0:
+            evictable = [k for k, e in _engine_registry.items() if k != key and not e["in_use"]][:overflow]
+            for evicted_key in evictable:
+                evicted = _engine_registry.pop(evicted_key)
+                evicted["engine"].dispose()
+                logger.info(f"Engine desalojado del registro (LRU): {evicted['label']}")
+            if len(evictable) < overflow:
+                logger.warning(f"Registro de engines excedido ({len(_engine_registry)}): todos los demás están en uso")
+        return engine
+
+def dispose_engines():
+    """Libera todos los engines registrados"""
+    with _engine_registry_lock:
+        while _engine_registry:
+            _, entry = _engine_registry.popitem()
+            entry["engine"].dispose()
+
+def _reset_engines_after_fork():
+    """En hijos prefork de Celery: descartar pools heredados sin cerrar los sockets del padre"""
+    global _engine_registry_lock
+    _engine_registry_lock = threading.Lock()
+    for entry in _engine_registry.values():
+        entry["engine"].dispose(close=False)
+    _engine_registry.clear()
+    engine.dispose(close=False)
+    status_engine.dispose(close=False)
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_engines_after_fork)
+
 # Mantener compatibilidad con código existente
 def create_temp_engine(db_config: Dict) -> create_engine:
     """Wrapper para mantener compatibilidad - usa la función unificada"""
@@ -330,12 +499,13 @@ def parse_sqlalchemy_error(e: Exception) -> Dict[str, Any]:
 def test_connection(db_config: Dict) -> Dict[str, Any]:
     """
     Función para probar conexión antes de usar en transferencias
+    (usa el engine registrado: las pruebas repetidas reutilizan el pool)
     """
     try:
-        engine = create_unified_engine(db_config)
+        db_engine = get_engine(db_config)
         
         # Probar conexión con manejo específico de cursores
-        with engine.connect() as conn:
+        with db_engine.connect() as conn:
             # Usar transacción explícita para evitar problemas de cursor
             trans = conn.begin()
             try:
@@ -347,7 +517,6 @@ def test_connection(db_config: Dict) -> Dict[str, Any]:
                 trans.rollback()
                 raise
         
-        engine.dispose()
         return {
             "success": True,
             "message": "Conexión exitosa",
@@ -0,0 +1,112 @@
+# app/core/id_allocator.py
+import logging
+import os
+import threading
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app.core.config import settings
+from app.core.database import SessionLocal, ensure_table
+from app.models.task import IdCounter
+
+logger = logging.getLogger(__name__)
+
+_counters = IdCounter.__table__
+
+
+class IdAllocator:
+    """
+    Asignador hi/lo para ids aplicativos (CONSECUTIVO = MAX + 1). Reserva bloques en id_counter
+    con un UPDATE ... OUTPUT atómico en su propia transacción y los entrega desde memoria:
+    inserciones concurrentes no repiten ids y una carga masiva reserva todo en un solo viaje.
+    Todas las altas de la tabla deben pedir sus ids aquí; los ids que sobran de un bloque se
+    pierden al reiniciar el proceso (quedan huecos, nunca duplicados).
+    """
+
+    def __init__(self, column, block_size: Optional[int] = None, session_factory=SessionLocal):
+        self.column = column.expression
+        self.name = f"{self.column.table.name}.{self.column.name}"
+        self.block_size = block_size or settings.ID_BLOCK_SIZE
+        self.session_factory = session_factory
+        self._next = 0
+        self._limit = 0
+        self._lock = threading.Lock()
+
+    def _reserve(self, count: int) -> int:
+        """Reserva count ids consecutivos en id_counter y devuelve el primero"""
+        db = self.session_factory()
+        try:
+            ensure_table(IdCounter, db.get_bind())
+            for _ in range(2):
+                next_value = db.execute(
+                    update(_counters)
+                    .where(_counters.c.name == self.name)
+                    .values(next_value=_counters.c.next_value + count)
+                    .returning(_counters.c.next_value)
+                ).scalar()
+                if next_value is not None:
+                    db.commit()
+                    return next_value - count
+                # Primer uso: el contador arranca después del máximo actual de la tabla
+                current_max = db.scalar(select(func.max(self.column)))
+                try:
+                    db.execute(insert(_counters).values(name=self.name, next_value=(current_max or 0) + 1))
+                    db.commit()
+                    logger.info(f"Contador {self.name} inicializado en {(current_max or 0) + 1}")
+                except IntegrityError:
+                    # Otro proceso lo inicializó al mismo tiempo: reintentar el UPDATE
+                    db.rollback()
+            raise RuntimeError(f"No se pudo reservar ids para {self.name}")
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def next_ids(self, count: int) -> List[int]:
+        """count ids únicos; solo consulta la BD cuando el bloque en memoria no alcanza"""
+        with self._lock:
+            ids = list(range(self._next, min(self._next + count, self._limit)))
+            self._next += len(ids)
+            missing = count - len(ids)
+            if missing:
+                size = max(missing, self.block_size)
+                start = self._reserve(size)
+                ids.extend(range(start, start + missing))
+                self._next, self._limit = start + missing, start + size
+            return ids
+
+    def next_id(self) -> int:
+        return self.next_ids(1)[0]
+
+    def reset(self):
+        """Descarta el bloque en memoria (tras un fork padre e hijo no deben repartir el mismo)"""
+        self._lock = threading.Lock()
+        self._next = self._limit = 0
+
+
+_allocators: Dict[str, IdAllocator] = {}
+_allocators_lock = threading.Lock()
+
+
+def get_id_allocator(column, block_size: Optional[int] = None) -> IdAllocator:
+    """Asignador del proceso para una columna (p. ej. SMatBOM.CONSECUTIVO)"""
+    expression = column.expression
+    name = f"{expression.table.name}.{expression.name}"
+    with _allocators_lock:
+        allocator = _allocators.get(name)
+        if allocator is None:
+            allocator = _allocators[name] = IdAllocator(column, block_size)
+        return allocator
+
+
+def _reset_allocators_after_fork():
+    global _allocators_lock
+    _allocators_lock = threading.Lock()
+    for allocator in _allocators.values():
+        allocator.reset()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_allocators_after_fork)
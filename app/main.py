@@ -1,11 +1,25 @@
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy import text
-from app.core.database import engine
+from starlette.concurrency import run_in_threadpool
+from app.core.database import engine, ensure_task_status_schema
 from app.utils.responses import standard_response
 from app.api.v1.router import api_router
 
-app = FastAPI(title="API con FastAPI y SQL Server", version="1.0.0")
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Esquema de task_status (índices de /tasks); si la BD no responde la API arranca igual
+    try:
+        await run_in_threadpool(ensure_task_status_schema)
+    except Exception as e:
+        logger.error(f"No se pudo aplicar el esquema de task_status: {str(e)}")
+    yield
+
+app = FastAPI(title="API con FastAPI y SQL Server", version="1.0.0", lifespan=lifespan)
 
 # Incluir el router principal de la API v1
 app.include_router(api_router, prefix="/api/v1")
\ No newline at end of file
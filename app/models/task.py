@@ -1,15 +1,20 @@
 # app/models/task.py
-from sqlalchemy import Column, String, DateTime, JSON, Integer, Float
+from sqlalchemy import BigInteger, Column, String, DateTime, JSON, Integer, Float, Index, UniqueConstraint
 from sqlalchemy.orm import DeclarativeBase
 from datetime import datetime
 class Base(DeclarativeBase):
     pass
 class TaskStatus(Base):
     __tablename__ = "task_status"
+    __table_args__ = (
+        # Listado /tasks: filtro por estado y paginación keyset por (created_at, id)
+        Index("ix_task_status_status_created_at", "status", "created_at"),
+        Index("ix_task_status_created_at_id", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    celery_task_id = Column(String, index=True, nullable=True)
-    status = Column(String, default="PENDING")
+    celery_task_id = Column(String(50), index=True, nullable=True)
+    status = Column(String(20), default="PENDING")
     progress = Column(Float, default=0.0)
     request_config = Column(JSON, nullable=False)
     result = Column(JSON, nullable=True)
@@ -24,4 +29,50 @@ class TaskStatus(Base):
     def duration(self):
         if self.start_time and self.end_time:
             return (self.end_time - self.start_time).total_seconds()
-        return None
\ No newline at end of file
+        return None
+
+
+class TransferCheckpoint(Base):
+    """Última posición confirmada en destino por tabla (o rango) de una transferencia"""
+    __tablename__ = "transfer_checkpoint"
+    __table_args__ = (UniqueConstraint("task_id", "table_key", name="uq_transfer_checkpoint_task_table"),)
+    
+    id = Column(Integer, primary_key=True, index=True)
+    task_id = Column(Integer, index=True, nullable=False)
+    table_key = Column(String(256), nullable=False)
+    strategy = Column(String(20), nullable=False)
+    position = Column(JSON, nullable=True)
+    partition_range = Column(String, nullable=True)
+    chunk_index = Column(Integer, default=0)
+    row_count = Column(Integer, default=0)
+    status = Column(String(20), default="PROCESSING")
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+
+class SyncWatermark(Base):
+    """Marca de agua de la sincronización incremental por par origen/destino y tabla"""
+    __tablename__ = "sync_watermark"
+    __table_args__ = (
+        UniqueConstraint("source_key", "target_key", "source_table", "target_table", name="uq_sync_watermark_pair"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    source_key = Column(String(256), nullable=False)
+    target_key = Column(String(256), nullable=False)
+    source_table = Column(String(256), nullable=False)
+    target_table = Column(String(256), nullable=False)
+    watermark_column = Column(String(128), nullable=False)
+    # Literal T-SQL del último valor aplicado (p. ej. '2024-05-01T10:30:00.000' o '2024-05-01T10:30:00.123456')
+    last_value = Column(String(100), nullable=True)
+    row_count = Column(Integer, default=0)
+    task_id = Column(Integer, nullable=True)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+
+class IdCounter(Base):
+    """Siguiente id libre por tabla.columna para el asignador hi/lo (app/core/id_allocator.py)"""
+    __tablename__ = "id_counter"
+    
+    name = Column(String(256), primary_key=True)
+    next_value = Column(BigInteger, nullable=False)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
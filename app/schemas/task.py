@@ -19,4 +19,32 @@ class TaskStatusResponse(BaseModel):
     start_time: Optional[datetime] = Field(None, description="Hora de inicio de procesamiento")
     end_time: Optional[datetime] = Field(None, description="Hora de finalización")
     duration: Optional[float] = Field(None, description="Duración en segundos")
-    warnings: List[str] = Field([], description="Advertencias durante el proceso")
\ No newline at end of file
+    warnings: List[str] = Field([], description="Advertencias durante el proceso")
+
+class TaskListItem(BaseModel):
+    id: int
+    task_id: Optional[str] = Field(None, description="ID de la tarea Celery")
+    status: Optional[str] = None
+    progress: Optional[float] = None
+    tables: List[str] = Field([], description="Tablas origen del request")
+    created_at: Optional[datetime] = None
+    start_time: Optional[datetime] = None
+    end_time: Optional[datetime] = None
+    duration: Optional[float] = Field(None, description="Duración en segundos")
+    transferred_rows: Optional[int] = None
+    rows_per_sec: Optional[float] = None
+    table_duration_p50: Optional[float] = Field(None, description="Mediana de duración por tabla (s)")
+    table_duration_p95: Optional[float] = Field(None, description="Percentil 95 de duración por tabla (s)")
+
+class TaskListSummary(BaseModel):
+    total_jobs: int
+    by_status: Dict[str, int] = Field({}, description="Tareas por estado")
+    failure_rate: Optional[float] = Field(None, description="FAILURE / (SUCCESS + FAILURE)")
+    rows_per_sec: Optional[float] = Field(None, description="Filas transferidas / segundos de las tareas terminadas")
+    duration_p50: Optional[float] = Field(None, description="Mediana de duración por tarea (s)")
+    duration_p95: Optional[float] = Field(None, description="Percentil 95 de duración por tarea (s)")
+
+class TaskListResponse(BaseModel):
+    items: List[TaskListItem]
+    next_cursor: Optional[str] = Field(None, description="Cursor para la siguiente página (None si no hay más)")
+    summary: Optional[TaskListSummary] = Field(None, description="Agregados del filtro (solo en la primera página)")
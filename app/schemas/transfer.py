@@ -17,8 +17,16 @@ class TableTransferConfig(BaseModel):
     order_by: Optional[str] = None
     # Modo de escritura (append, truncate, upsert)
     write_mode: str = Field("append", pattern="append|truncate|upsert")
-    # Clave para upsert
+    # Clave para upsert ("A" o "A,B"); si se omite se usa la llave primaria del destino
     upsert_key: Optional[str] = None
+    # Estrategia de paginación (auto detecta PK/índice único, si no usa OFFSET)
+    chunking: str = Field("auto", pattern="auto|keyset|offset")
+    # Columnas llave para paginación por llave (si no se especifican se detectan)
+    key_columns: Optional[List[str]] = None
+    # Sincronización: full (copia completa) o incremental (solo filas posteriores a la marca de agua)
+    sync_mode: str = Field("full", pattern="full|incremental")
+    # Columna de fecha/versión que define la marca de agua (p. ej. FECHAMODIFICA)
+    watermark_column: Optional[str] = None
 
 class DatabaseConfig(BaseModel):
     server: str
@@ -32,9 +40,48 @@ class TransferRequest(BaseModel):
     target: DatabaseConfig
     tables: List[TableTransferConfig]
     chunk_size: int = Field(1000, ge=100)
+    # Tamaño de chunk: fixed (chunk_size siempre) o adaptive (parte de chunk_size y se ajusta por tabla)
+    chunk_sizing: str = Field("fixed", pattern="fixed|adaptive")
+    # Duración objetivo de lectura + escritura de cada chunk en modo adaptive
+    target_chunk_seconds: float = Field(2.0, gt=0)
+    # Límites del tamaño adaptativo
+    chunk_size_min: int = Field(100, ge=1)
+    chunk_size_max: int = Field(50000, ge=100)
+    # Techo de memoria estimada por chunk en modo adaptive
+    chunk_memory_mb: int = Field(64, ge=1)
     max_workers: int = Field(1, ge=1)
+    # Motor: serial (una tabla tras otra), parallel (tablas y rangos en hilos del mismo worker)
+    # o distributed (una subtarea Celery por tabla/rango repartida entre workers)
+    execution_mode: str = Field("serial", pattern="serial|parallel|distributed")
+    # Rangos de llave en que se divide cada tabla grande (modo parallel)
+    partitions: int = Field(1, ge=1, le=64)
+    # Filas mínimas para dividir una tabla en rangos
+    partition_min_rows: int = Field(1000000, ge=1)
+    # Máximo de conexiones abiertas entre origen y destino (por defecto max_workers por unidad)
+    connection_budget: Optional[int] = Field(None, ge=2)
+    # Lectura: chunked (una consulta por chunk) o stream (un solo SELECT con fetchmany)
+    read_mode: str = Field("chunked", pattern="chunked|stream")
+    # Escritura: fast (pyodbc fast_executemany) o executemany (tuplas posicionales vía exec_driver_sql)
+    insert_mode: str = Field("fast", pattern="fast|executemany")
+    # Pipeline: lectura del chunk N+1 en paralelo con la escritura del chunk N
+    pipeline: bool = False
+    # Chunks en cola entre la etapa lectora y las escritoras
+    queue_depth: int = Field(2, ge=1, le=32)
+    # Hilos escritores hacia la base de datos destino
+    writer_count: int = Field(1, ge=1, le=8)
+    # Guardar la posición cada N chunks escritos para poder reanudar (0 desactiva)
+    checkpoint_interval: int = Field(1, ge=0)
+    # Conteo de filas: auto (metadatos si la tabla no tiene where_clause) o exact (COUNT(*) siempre)
+    count_mode: str = Field("auto", pattern="auto|exact")
     # Opciones avanzadas
+    # Filas por transacción en destino: los chunks se escriben al llegar y se confirma al alcanzarlas
     transaction_size: int = Field(1000, ge=1)
+    # Insertar con TABLOCK (un bloqueo de tabla; fuerza un solo escritor por tabla)
+    table_lock: bool = False
+    # Deshabilitar índices no agrupados no únicos del destino durante la carga y reconstruirlos al final
+    disable_indexes: bool = False
+    # Releer columnas y llaves del catálogo aunque estén vigentes en la caché del worker
+    refresh_schema: bool = False
     skip_errors: bool = False
     # Callbacks para integración
     on_start: Optional[str] = None
@@ -0,0 +1,93 @@
+# app/tasks/distributed_transfer.py
+import logging
+from datetime import datetime
+from typing import Dict, List
+
+from celery import chord, group, shared_task
+from app.tasks.parallel_transfer import ParallelTransferWorker
+from app.worker.database_worker import DataTransferWorker
+from app.worker.unit_progress import UnitProgress, clear_unit_progress
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True, name="distributed_transfer.plan")
+def start_distributed_transfer(self, transfer_config, db_task_id):
+    """Divide el request en una subtarea por tabla (o rango de llave) y las reparte con un chord"""
+    planner = ParallelTransferWorker(transfer_config, db_task_id, self)
+    try:
+        planner.connect_databases()
+        units, partitioned = planner.plan_units()
+        planner.prepare_partitioned_targets(partitioned)
+    finally:
+        planner.disconnect()
+
+    logger.info(f"Transferencia distribuida {db_task_id}: {len(units)} subtareas en cola 'transfers'")
+    if planner.status_writer:
+        planner.status_writer.start(datetime.now())
+    # Un reintento o reanudación no debe sumar el avance de subtareas anteriores
+    clear_unit_progress(db_task_id)
+
+    subtasks = group(transfer_unit.s(transfer_config, unit, db_task_id, len(units)) for unit in units)
+    callback = aggregate_transfer_results.s(transfer_config, db_task_id, partitioned)
+    # El callback hereda el id de esta tarea: /tasks/{task_id} ve el resultado agregado
+    return self.replace(chord(subtasks, callback))
+
+
+@shared_task(bind=True, name="distributed_transfer.unit")
+def transfer_unit(self, transfer_config, unit, db_task_id, total_units: int = 1):
+    """Copia una tabla o un rango; los errores se devuelven en las estadísticas para el agregado"""
+    # Inicio y fin en TaskStatus los escriben el planificador y el agregado; la subtarea solo
+    # aporta su avance al agregado de todas (UnitProgress)
+    worker = DataTransferWorker({**transfer_config, "tables": [unit]}, db_task_id, self, report_status=False)
+    if db_task_id:
+        worker.unit_progress = UnitProgress(db_task_id, worker._stats_key(unit), total_units)
+    try:
+        return worker.execute_transfer()
+    except Exception as e:
+        logger.error(f"Subtarea {worker._stats_key(unit)} falló: {str(e)}")
+        return worker.stats
+
+
+@shared_task(bind=True, name="distributed_transfer.aggregate")
+def aggregate_transfer_results(self, results: List[Dict], transfer_config, db_task_id, partitioned):
+    """Callback del chord: combina las estadísticas de las subtareas y guarda el resultado en TaskStatus"""
+    aggregator = ParallelTransferWorker(transfer_config, db_task_id, self)
+    stats = aggregator.stats
+
+    for result in results:
+        stats["total_rows"] += result.get("total_rows", 0)
+        stats["transferred_rows"] += result.get("transferred_rows", 0)
+        stats["completed_tables"] += result.get("completed_tables", 0)
+        stats["errors"].extend(result.get("errors", []))
+        stats["warnings"].extend(result.get("warnings", []))
+        stats["table_details"].update(result.get("table_details", {}))
+        for stage, seconds in (result.get("stage_timings") or {}).items():
+            stats["stage_timings"][stage] = round(stats["stage_timings"].get(stage, 0.0) + seconds, 3)
+
+    for table_name, units in partitioned.items():
+        aggregator.merge_partition_stats(table_name, units)
+        aggregator.commit_sync_watermarks(units)
+
+    if any(units[0].get("disabled_indexes") for units in partitioned.values()):
+        aggregator.connect_databases()
+        try:
+            aggregator.finish_partitioned_targets(partitioned)
+        finally:
+            aggregator.disconnect()
+
+    failed = (
+        any(result.get("status") == "FAILED" for result in results)
+        or any(details.get("status") == "FAILED" for details in stats["table_details"].values())
+    )
+    stats["status"] = "FAILED" if failed else "COMPLETED"
+    stats["end_time"] = datetime.now()
+
+    status = "FAILURE" if failed and not transfer_config.get("skip_errors", False) else "SUCCESS"
+    aggregator.finish_status(status)
+    clear_unit_progress(db_task_id)
+    logger.info(f"Transferencia distribuida {db_task_id} finalizada: {stats['transferred_rows']} filas ({status})")
+    if status == "FAILURE":
+        # Igual que el worker serial: el callback del chord debe terminar en FAILURE en Celery
+        raise RuntimeError(f"Transferencia distribuida {db_task_id} con {len(stats['errors'])} errores")
+    return stats
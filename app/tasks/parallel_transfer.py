@@ -1,48 +1,227 @@
-from app.core import celery
+# app/tasks/parallel_transfer.py
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Tuple
+
+from celery import shared_task
+from app.utils.helpers import sql_literal
 from app.worker.database_worker import DataTransferWorker
 
-@celery.task(bind=True, name="parallel_transfer")
-def execute_parallel_transfer(self, transfer_config, task_id):
-    worker = ParallelTransferWorker(transfer_config, task_id, self)
-    return worker.execute()
-
-class ParallelTransferWorker:
-    def execute(self):
-        from concurrent.futures import ThreadPoolExecutor, as_completed
-        
-        tables = self.config["tables"]
-        results = {}
-        
-        with ThreadPoolExecutor(max_workers=self.config["max_workers"]) as executor:
-            futures = {
-                executor.submit(
-                    self.transfer_single_table, 
-                    table_config
-                ): table_config["source_table"]
-                for table_config in tables
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True, name="parallel_transfer")
+def execute_parallel_transfer(self, transfer_config, db_task_id):
+    worker = ParallelTransferWorker(transfer_config, db_task_id, self)
+    return worker.execute_transfer()
+
+
+class ParallelTransferWorker(DataTransferWorker):
+    """
+    Transferencia con dos niveles de paralelismo:
+    - varias tablas a la vez (max_workers)
+    - una tabla grande dividida en rangos de su llave, cada rango en un hilo
+    El total de conexiones abiertas se limita con connection_budget.
+    """
+
+    def __init__(self, transfer_config: Dict, db_task_id: int, celery_task: Any, report_status: bool = True):
+        super().__init__(transfer_config, db_task_id, celery_task, report_status)
+        # Conexiones por unidad de trabajo: 1 lectora + escritoras
+        writers = self.config.get("writer_count", 1) if self.config.get("pipeline", False) else 1
+        self.connections_per_unit = 1 + writers
+        budget = self.config.get("connection_budget") or self.config.get("max_workers", 1) * self.connections_per_unit
+        self.worker_count = max(1, min(self.config.get("max_workers", 1), budget // self.connections_per_unit))
+        self.writers_per_unit = writers
+
+    def pool_options(self, role: str) -> Dict[str, int]:
+        """El pool de cada engine es el tope real de conexiones (sin overflow)"""
+        size = self.worker_count if role == "source" else self.worker_count * self.writers_per_unit
+        return {"pool_size": size, "max_overflow": 0}
+
+    def get_partition_boundaries(self, base_query: str, key_column: str, partitions: int) -> List[Any]:
+        """Límites inferiores de cada rango: MIN/MAX para llaves enteras, NTILE para el resto"""
+        column = f"[{key_column}]"
+        bounds = self.execute_query_safe(
+            self.source_engine, f"SELECT MIN({column}), MAX({column}) FROM ({base_query}) AS src"
+        )["rows"][0]
+        low, high = bounds[0], bounds[1]
+        if low is None:
+            return []
+
+        if isinstance(low, int) and not isinstance(low, bool):
+            step = (high - low + 1) / partitions
+            boundaries = [low + int(step * i) for i in range(partitions)]
+        else:
+            ntile_query = f"""
+            SELECT MIN(k) FROM (
+                SELECT {column} AS k, NTILE({partitions}) OVER (ORDER BY {column}) AS bucket
+                FROM ({base_query}) AS src
+            ) AS buckets
+            GROUP BY bucket
+            ORDER BY MIN(k)
+            """
+            boundaries = [row[0] for row in self.execute_query_safe(self.source_engine, ntile_query)["rows"]]
+
+        # Llaves repetidas producen límites iguales: se eliminan los rangos vacíos
+        unique = []
+        for boundary in boundaries:
+            if not unique or boundary != unique[-1]:
+                unique.append(boundary)
+        return unique
+
+    def plan_partitions(self, table_config: Dict) -> List[Dict]:
+        """Divide una tabla grande en rangos [límite_i, límite_i+1) de la primera columna de su llave"""
+        partitions = self.config.get("partitions", 1)
+        if partitions <= 1 or table_config.get("row_limit"):
+            return [table_config]
+
+        table_name = table_config["source_table"]
+        try:
+            strategy, key_columns = self._resolve_chunking(table_config)
+            if strategy != "keyset":
+                return [table_config]
+
+            base_query = self.build_select_query({**table_config, "order_by": None, "row_limit": None})
+            total_rows, count_source = self.count_rows(table_config, base_query)
+            if total_rows < self.config.get("partition_min_rows", 1000000):
+                return [{**table_config, "key_columns": key_columns}]
+
+            boundaries = self.get_partition_boundaries(base_query, key_columns[0], partitions)
+            literals = [sql_literal(boundary) for boundary in boundaries]
+        except Exception as e:
+            logger.warning(f"No se pudo particionar {table_name}, se copia completa: {str(e)}")
+            return [table_config]
+
+        if len(literals) < 2:
+            return [{**table_config, "key_columns": key_columns}]
+
+        column = f"[{key_columns[0]}]"
+        # Con estimación, cada rango recibe una parte en lugar de contar su rango con COUNT(*)
+        unit_rows = total_rows // len(literals) if count_source == "estimate" else None
+        units = []
+        for index, lower in enumerate(literals):
+            range_conditions = []
+            if index > 0:
+                range_conditions.append(f"{column} >= {lower}")
+            if index < len(literals) - 1:
+                range_conditions.append(f"{column} < {literals[index + 1]}")
+            conditions = [f"({table_config['where_clause']})"] if table_config.get("where_clause") else []
+            units.append({
+                **table_config,
+                "where_clause": " AND ".join(conditions + range_conditions),
+                "key_columns": key_columns,
+                "chunking": "keyset",
+                "partition_of": table_name,
+                "partition_index": index,
+                "partition_range": " AND ".join(range_conditions),
+                "estimated_rows": unit_rows,
+            })
+
+        logger.info(f"Tabla {table_name}: {total_rows} filas divididas en {len(units)} rangos de {key_columns[0]}")
+        return units
+
+    def merge_partition_stats(self, table_name: str, units: List[Dict]):
+        """Combina las estadísticas de los rangos de una tabla en una sola entrada"""
+        details = self.stats["table_details"]
+        with self._stats_lock:
+            parts = [(unit, details.pop(self._stats_key(unit), None)) for unit in units]
+            parts = [(unit, part) for unit, part in parts if part is not None]
+            if not parts:
+                return
+
+            failed = [part for _, part in parts if part["status"] == "FAILED"]
+            stage_timings: Dict[str, float] = {}
+            for _, part in parts:
+                for stage, seconds in (part.get("stage_timings") or {}).items():
+                    stage_timings[stage] = round(stage_timings.get(stage, 0.0) + seconds, 3)
+
+            merged = {
+                "status": "FAILED" if failed else "COMPLETED",
+                "total_rows": sum(part["total_rows"] for _, part in parts),
+                "transferred": sum(part["transferred"] for _, part in parts),
+                "start_time": min(part["start_time"] for _, part in parts),
+                "end_time": max((part["end_time"] for _, part in parts if part["end_time"]), default=None),
+                "errors": sum(part["errors"] for _, part in parts),
+                "chunking_strategy": "keyset",
+                "key_columns": parts[0][0]["key_columns"],
+                "stage_timings": stage_timings,
+                "partitions": [
+                    {
+                        "range": unit.get("partition_range"),
+                        "status": part["status"],
+                        "total_rows": part["total_rows"],
+                        "transferred": part["transferred"],
+                    }
+                    for unit, part in parts
+                ],
             }
-            
-            for future in as_completed(futures):
-                table_name = futures[future]
-                try:
-                    results[table_name] = future.result()
-                except Exception as e:
-                    results[table_name] = {"status": "FAILED", "error": str(e)}
-        
-        return {
-            "status": "COMPLETED",
-            "table_results": results,
-            "stats": self.stats
-        }
-    
-    def transfer_single_table(self, table_config):
-        # Reutilizar la lógica de transferencia de DataTransferWorker
-        table_worker = DataTransferWorker(
-            self.config, 
-            self.task_id, 
-            self.celery_task
-        )
-        table_worker.connect_databases()
-        result = table_worker.transfer_table(table_config)
-        table_worker.disconnect()
-        return result
\ No newline at end of file
+            if failed:
+                merged["error"] = [part.get("error") for part in failed]
+            details[table_name] = merged
+            self.stats["completed_tables"] += 1
+
+    def plan_units(self) -> Tuple[List[Dict], Dict[str, List[Dict]]]:
+        """Unidades de trabajo del request (tablas o rangos) y rangos agrupados por tabla"""
+        units: List[Dict] = []
+        partitioned: Dict[str, List[Dict]] = {}
+        self.preload_schemas()
+        for table_config in self.config["tables"]:
+            table_units = self.plan_partitions(self.prepare_table(table_config))
+            if len(table_units) > 1:
+                partitioned[table_config["source_table"]] = table_units
+            units.extend(table_units)
+        return units, partitioned
+
+    def prepare_partitioned_targets(self, partitioned: Dict[str, List[Dict]]):
+        """
+        Preparación del destino que los rangos no hacen por su cuenta, una vez por tabla:
+        truncate (salvo al reanudar con avance) y deshabilitar índices (disable_indexes).
+        """
+        for table_name, units in partitioned.items():
+            if units[0].get("write_mode") == "truncate":
+                if any(self.has_checkpoint(unit) for unit in units):
+                    logger.info(f"Tabla {table_name}: reanudación con avance previo, no se vacía el destino")
+                else:
+                    self.truncate_target(units[0])
+            if self.config.get("disable_indexes", False):
+                disabled_indexes = self.disable_target_indexes(units[0])
+                for unit in units:
+                    unit["disabled_indexes"] = disabled_indexes
+
+    def finish_partitioned_targets(self, partitioned: Dict[str, List[Dict]]):
+        """Reconstruye los índices deshabilitados por prepare_partitioned_targets"""
+        for table_name, units in partitioned.items():
+            disabled_indexes = units[0].get("disabled_indexes")
+            if disabled_indexes:
+                self.rebuild_target_indexes(units[0], disabled_indexes)
+                details = self.stats["table_details"].get(table_name)
+                if details is not None:
+                    details["disabled_indexes"] = disabled_indexes
+
+    def _run_tables(self):
+        """Ejecuta tablas y rangos en un pool de hilos acotado por el presupuesto de conexiones"""
+        units, partitioned = self.plan_units()
+
+        logger.info(f"Transferencia paralela: {len(units)} unidades con {self.worker_count} hilos")
+        skip_errors = self.config.get("skip_errors", False)
+        try:
+            self.prepare_partitioned_targets(partitioned)
+            with ThreadPoolExecutor(max_workers=self.worker_count, thread_name_prefix="transfer") as executor:
+                futures = {executor.submit(self.transfer_table_data, unit): unit for unit in units}
+                for future in as_completed(futures):
+                    unit = futures[future]
+                    try:
+                        future.result()
+                    except Exception as e:
+                        if not skip_errors:
+                            # Cancelar lo pendiente; las unidades en curso terminan antes de salir
+                            for pending in futures:
+                                pending.cancel()
+                            raise
+                        logger.warning(f"Tabla {self._stats_key(unit)} omitida: {str(e)}")
+        finally:
+            for table_name, table_units in partitioned.items():
+                self.merge_partition_stats(table_name, table_units)
+            self.finish_partitioned_targets(partitioned)
+            self.commit_sync_watermarks(units)
+            self._update_progress(force=True)
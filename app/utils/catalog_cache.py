@@ -0,0 +1,228 @@
+# app/utils/catalog_cache.py
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional, Set
+
+from sqlalchemy import column, literal, select, table
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.worker.progress_events import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Bajas de llaves publicadas para los demás procesos (workers de uvicorn y Celery)
+CATALOG_CHANNEL = "catalog_invalidation"
+LISTENER_RETRY_SECONDS = 5.0
+
+_catalogs: Dict[str, "CatalogCache"] = {}
+
+
+class CatalogCache:
+    """
+    Llaves de un catálogo (SPartes.NUMPARTE, GUniMedida.ClaveUni) en memoria para validar
+    existencia sin consultar la BD. Un acierto se responde desde memoria; una llave ausente
+    se confirma en la BD (alta reciente de otro proceso o aplicación) y se agrega si existe.
+
+    Se usa un conjunto exacto y no un filtro probabilístico: en las validaciones lo común es
+    que la llave exista, y con un filtro de Bloom cada positivo requeriría confirmar en la BD,
+    es decir, la misma consulta que se quiere evitar.
+
+    Cada refresh_seconds se agregan las filas con changed_column reciente (si el catálogo la
+    tiene); cada reload_seconds se recarga completo para reflejar bajas hechas fuera de la API.
+    Las bajas hechas por la API se publican en CATALOG_CHANNEL y cada proceso las aplica.
+    """
+
+    def __init__(self, table_name: str, key_column: str, changed_column: Optional[str] = None,
+                 refresh_seconds: float = settings.CATALOG_REFRESH_SECONDS,
+                 reload_seconds: float = settings.CATALOG_RELOAD_SECONDS):
+        columns = [column(key_column)] + ([column(changed_column)] if changed_column else [])
+        self.table = table(table_name, *columns)
+        self.key = self.table.c[key_column]
+        self.changed = self.table.c[changed_column] if changed_column else None
+        self.refresh_seconds = refresh_seconds
+        self.reload_seconds = reload_seconds
+        self._keys: Optional[Set[str]] = None
+        self._loaded_at = 0.0
+        self._refreshed_at = 0.0
+        self._mark = None
+        self._lock = threading.Lock()
+        # Bajas recibidas mientras corre una carga completa: se aplican al conjunto nuevo
+        self._loading: Optional[Set[str]] = None
+        self._discard_lock = threading.Lock()
+        _catalogs[table_name] = self
+
+    @staticmethod
+    def normalize(key: str) -> str:
+        # Collation *_CI_AS: sin distinguir mayúsculas y '=' ignora espacios finales
+        return key.rstrip().upper()
+
+    def _load(self, db: Session):
+        """Carga completa de llaves (y marca de cambios) en lotes"""
+        start = time.monotonic()
+        query = select(self.key) if self.changed is None else select(self.key, self.changed)
+        keys, mark = set(), None
+        with self._discard_lock:
+            self._loading = set()
+        try:
+            for row in db.execute(query.execution_options(yield_per=10000)):
+                if row[0] is not None:
+                    keys.add(self.normalize(row[0]))
+                if self.changed is not None and row[1] is not None and (mark is None or row[1] > mark):
+                    mark = row[1]
+        finally:
+            with self._discard_lock:
+                discarded, self._loading = self._loading, None
+        with self._discard_lock:
+            # Una baja publicada durante el recorrido pudo llegar después de leer la llave
+            keys -= discarded
+            self._keys, self._mark = keys, mark
+        self._loaded_at = self._refreshed_at = time.monotonic()
+        logger.info(f"Catálogo {self.table.name}: {len(keys)} llaves cargadas en {time.monotonic() - start:.2f}s")
+
+    def _refresh(self, db: Session):
+        """Agrega las llaves modificadas desde la última marca"""
+        if self.changed is not None:
+            query = select(self.key, self.changed)
+            if self._mark is not None:
+                query = query.where(self.changed >= self._mark)
+            for key, changed in db.execute(query):
+                if key is not None:
+                    self._keys.add(self.normalize(key))
+                if changed is not None and (self._mark is None or changed > self._mark):
+                    self._mark = changed
+        self._refreshed_at = time.monotonic()
+
+    def _sync(self, db: Session) -> Set[str]:
+        ensure_invalidation_listener()
+        with self._lock:
+            now = time.monotonic()
+            if self._keys is None or now - self._loaded_at >= self.reload_seconds:
+                self._load(db)
+            elif now - self._refreshed_at >= self.refresh_seconds:
+                self._refresh(db)
+            return self._keys
+
+    def contains(self, key: str) -> Optional[bool]:
+        """Solo memoria: True si la llave está en el conjunto vigente, None si hay que ir a la BD"""
+        keys = self._keys
+        now = time.monotonic()
+        if keys is None or now - self._loaded_at >= self.reload_seconds or now - self._refreshed_at >= self.refresh_seconds:
+            return None
+        return True if self.normalize(key) in keys else None
+
+    def exists(self, db: Session, key: str) -> bool:
+        """Existencia de la llave: memoria y, si no está, confirmación en la BD (bloqueante)"""
+        if self.normalize(key) in self._sync(db):
+            return True
+        found = db.execute(select(literal(1)).select_from(self.table).where(self.key == key)).first() is not None
+        if found:
+            self.add(key)
+        return found
+
+    def add(self, key: str):
+        keys = self._keys
+        if keys is not None and key:
+            keys.add(self.normalize(key))
+
+    def discard(self, key: str):
+        """Baja de una llave en este proceso y, vía Redis, en los demás"""
+        self._discard_local(key)
+        publish_discard(self.table.name, key)
+
+    def _discard_local(self, key: str):
+        if not key:
+            return
+        key = self.normalize(key)
+        with self._discard_lock:
+            if self._loading is not None:
+                self._loading.add(key)
+            if self._keys is not None:
+                self._keys.discard(key)
+
+    def invalidate(self):
+        """Fuerza una recarga completa en el siguiente uso"""
+        with self._lock:
+            self._keys = None
+
+
+def publish_discard(table_name: str, key: str):
+    try:
+        get_redis().publish(CATALOG_CHANNEL, json.dumps({"table": table_name, "key": key}))
+    except Exception as e:
+        # Los demás procesos la verán en su siguiente recarga completa (CATALOG_RELOAD_SECONDS)
+        logger.warning(f"No se pudo publicar la baja de {key} en {table_name}: {str(e)}")
+
+
+def _apply_message(data):
+    try:
+        payload = json.loads(data)
+        catalog = _catalogs.get(payload["table"])
+    except (ValueError, TypeError, KeyError):
+        logger.warning(f"Mensaje inválido en {CATALOG_CHANNEL}: {data!r}")
+        return
+    if catalog is not None:
+        catalog._discard_local(payload["key"])
+
+
+def _listen():
+    """Hilo del proceso: aplica las bajas publicadas; reconecta si Redis no está disponible"""
+    failed = False
+    while True:
+        pubsub = None
+        try:
+            pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(CATALOG_CHANNEL)
+            # Sin suscripción pudieron perderse bajas: recargar lo que ya estuviera en memoria
+            # (en la primera suscripción todavía no hay nada cargado)
+            for catalog in _catalogs.values():
+                if catalog._keys is not None or catalog._loading is not None:
+                    catalog.invalidate()
+            _subscribed.set()
+            failed = False
+            while True:
+                message = pubsub.get_message(timeout=1.0)
+                if message is not None:
+                    _apply_message(message["data"])
+        except Exception as e:
+            if not failed:
+                logger.warning(f"Suscripción a {CATALOG_CHANNEL} interrumpida: {str(e)}")
+            failed = True
+            time.sleep(LISTENER_RETRY_SECONDS)
+        finally:
+            if pubsub is not None:
+                try:
+                    pubsub.close()
+                except Exception:
+                    pass
+
+
+_listener_pid: Optional[int] = None
+_listener_lock = threading.Lock()
+_subscribed = threading.Event()
+# Espera máxima de la primera carga a que la suscripción quede activa
+SUBSCRIBE_WAIT_SECONDS = 1.0
+
+
+def ensure_invalidation_listener():
+    """
+    Arranca el hilo suscriptor una vez por proceso (también en hijos tras un fork) y espera
+    a que se suscriba, para que la primera carga no pierda bajas publicadas mientras tanto.
+    """
+    global _listener_pid, _subscribed
+    if _listener_pid == os.getpid():
+        return
+    with _listener_lock:
+        if _listener_pid != os.getpid():
+            _listener_pid = os.getpid()
+            _subscribed = threading.Event()
+            threading.Thread(target=_listen, name="catalog-invalidation", daemon=True).start()
+            _subscribed.wait(SUBSCRIBE_WAIT_SECONDS)
+
+
+# Catálogos consultados por las validaciones de SMatBOM
+partes_catalog = CatalogCache("SPartes", "NUMPARTE", changed_column="FECHAMODIFICA_ISO")
+unimed_catalog = CatalogCache("GUniMedida", "ClaveUni")
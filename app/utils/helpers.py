@@ -0,0 +1,53 @@
+# app/utils/helpers.py
+import base64
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any
+
+
+def to_jsonable(value: Any) -> Any:
+    """Convierte recursivamente datetimes/Decimal a tipos serializables en columnas JSON"""
+    if isinstance(value, dict):
+        return {key: to_jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_jsonable(item) for item in value]
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def sql_literal(value: Any) -> str:
+    """Representa un valor como literal T-SQL para filtros generados (rangos, marcas de agua)"""
+    if isinstance(value, bool):
+        return str(int(value))
+    if isinstance(value, (int, float, Decimal)):
+        return str(value)
+    # Formatos ISO 8601 y yyyymmdd: no dependen del DATEFORMAT/idioma de la sesión
+    if isinstance(value, datetime):
+        # Microsegundos completos para datetime2; los valores de columnas datetime llegan en
+        # milisegundos exactos y van con 3 decimales (datetime no convierte un texto con 6)
+        timespec = "milliseconds" if value.microsecond % 1000 == 0 else "microseconds"
+        return f"'{value.isoformat(sep='T', timespec=timespec)}'"
+    if isinstance(value, date):
+        return f"'{value.strftime('%Y%m%d')}'"
+    if isinstance(value, str):
+        return "N'" + value.replace("'", "''") + "'"
+    raise TypeError(f"Tipo no soportado como literal SQL: {type(value).__name__}")
+
+
+def encode_cursor(value: Any) -> str:
+    """Cursor opaco de paginación keyset (JSON en base64 urlsafe)"""
+    raw = json.dumps(to_jsonable(value), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Any:
+    """Inverso de encode_cursor; ValueError si el cursor no es válido"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        return json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Cursor inválido") from e
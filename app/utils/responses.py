@@ -1,6 +1,16 @@
-from typing import Any, Optional, List
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any, Optional, List, Tuple
+from fastapi import Response
 from pydantic import BaseModel
-from datetime import datetime
+from sqlalchemy.inspection import inspect
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional: sin él se usa json de la biblioteca estándar
+    orjson = None
 
 # Schema para respuesta estándar
 class StandardResponse(BaseModel):
@@ -10,6 +20,7 @@ class StandardResponse(BaseModel):
     data: Optional[Any] = None
     hasMore: Optional[int] = None
     totalRecords: Optional[int] = None
+    nextCursor: Optional[str] = None
 
 # Modelos de respuesta para documentación en Swagger
 class BaseResponse(BaseModel):
@@ -25,7 +36,8 @@ class PaginatedResponse(BaseResponse):
     """Respuesta paginada con datos"""
     data: List[Any]
     hasMore: int
-    totalRecords: int
+    totalRecords: Optional[int] = None
+    nextCursor: Optional[str] = None
 
 class ErrorResponse(BaseResponse):
     """Respuesta de error"""
@@ -46,7 +58,43 @@ class DeleteResponse(BaseResponse):
     data: Optional[Any] = None
     success: bool = True
 
-def standard_response(data: Optional[Any] = None, message: str = "OK", success: bool = True, hasMore: Optional[int] = None, totalRecords: Optional[int] = None, generatedAt: Optional[datetime] = None) -> dict:
+@lru_cache(maxsize=None)
+def _column_keys(model_class) -> Tuple[str, ...]:
+    """Columnas del modelo (el mapper se inspecciona una vez por clase, no por fila)"""
+    return tuple(column.key for column in inspect(model_class).columns)
+
+def model_to_dict(obj: Any) -> dict:
+    return {key: getattr(obj, key) for key in _column_keys(obj.__class__)}
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        # Igual que Pydantic: Decimal como texto para no perder precisión
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Tipo no serializable: {type(value).__name__}")
+
+def dumps_json(content: Any) -> bytes:
+    """Serializa a JSON (orjson si está instalado) manejando Decimal y datetime"""
+    if orjson is not None:
+        return orjson.dumps(content, default=_json_default)
+    return json.dumps(content, default=_json_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+class JSONBytesResponse(Response):
+    """Respuesta JSON cuyo cuerpo ya viene codificado"""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return content if isinstance(content, bytes) else dumps_json(content)
+
+def encoded_response(content: dict, status_code: int = 200) -> JSONBytesResponse:
+    """
+    Envía el sobre estándar ya serializado. Al devolver un Response, FastAPI no vuelve a
+    validar ni serializar contra response_model (que queda solo para la documentación).
+    """
+    return JSONBytesResponse(content=dumps_json(content), status_code=status_code)
+
+def standard_response(data: Optional[Any] = None, message: str = "OK", success: bool = True, hasMore: Optional[int] = None, totalRecords: Optional[int] = None, generatedAt: Optional[datetime] = None, nextCursor: Optional[str] = None) -> dict:
     """
     Función para crear respuestas estándar de la API
     
@@ -57,6 +105,7 @@ def standard_response(data: Optional[Any] = None, message: str = "OK", success:
         hasMore: Indica si hay más registros disponibles
         totalRecords: Total de registros encontrados
         generatedAt: Timestamp de generación (se auto-genera si es None)
+        nextCursor: Cursor para pedir la página siguiente (paginación keyset)
     
     Returns:
         dict: Respuesta estándar con formato consistente
@@ -72,26 +121,12 @@ def standard_response(data: Optional[Any] = None, message: str = "OK", success:
     
     # Solo agregar campos opcionales si no son None
     if data is not None:
-        # Si data es un objeto SQLAlchemy, convertirlo a dict
         if hasattr(data, '__dict__') and hasattr(data, '__table__'):
             # Es un modelo SQLAlchemy, convertir a dict
-            from sqlalchemy.inspection import inspect
-            mapper = inspect(data.__class__)
-            data_dict = {}
-            for column in mapper.columns:
-                data_dict[column.key] = getattr(data, column.key)
-            response["data"] = data_dict
+            response["data"] = model_to_dict(data)
         elif isinstance(data, list) and data and hasattr(data[0], '__dict__') and hasattr(data[0], '__table__'):
             # Es una lista de modelos SQLAlchemy
-            from sqlalchemy.inspection import inspect
-            data_list = []
-            for item in data:
-                mapper = inspect(item.__class__)
-                item_dict = {}
-                for column in mapper.columns:
-                    item_dict[column.key] = getattr(item, column.key)
-                data_list.append(item_dict)
-            response["data"] = data_list
+            response["data"] = [model_to_dict(item) for item in data]
         else:
             response["data"] = data
     
@@ -101,6 +136,9 @@ def standard_response(data: Optional[Any] = None, message: str = "OK", success:
     if totalRecords is not None:
         response["totalRecords"] = totalRecords
     
+    if nextCursor is not None:
+        response["nextCursor"] = nextCursor
+    
     return response
 
 # Funciones helper adicionales
@@ -111,10 +149,11 @@ def error_response(message: str = "Error en la operación", data: Optional[Any]
     return standard_response(data=data, message=message, success=False)
 
 # Función específica para respuestas paginadas
-def paginated_response(data: Any, total_records: int, has_more: bool = False, message: str = "Datos obtenidos exitosamente"):
+def paginated_response(data: Any, total_records: Optional[int] = None, has_more: bool = False, message: str = "Datos obtenidos exitosamente", next_cursor: Optional[str] = None):
     return standard_response(
         data=data, 
         message=message, 
         hasMore=1 if has_more else 0,
-        totalRecords=total_records
+        totalRecords=total_records,
+        nextCursor=next_cursor
     )
\ No newline at end of file
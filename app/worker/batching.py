@@ -0,0 +1,73 @@
+# app/worker/batching.py
+import logging
+from typing import Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ChunkBatch:
+    """
+    Transacción abierta en la conexión de un escritor: cada chunk se inserta al llegar y el
+    conjunto se confirma cada transaction_size filas. En memoria solo quedan las posiciones
+    de los chunks sin confirmar, no sus filas.
+    """
+
+    def __init__(self, engine, transaction_size: int):
+        self.engine = engine
+        self.transaction_size = max(1, transaction_size)
+        self.rows = 0
+        # (índice, posición) de cada chunk escrito y sin confirmar, para avanzar checkpoints al confirmar
+        self.chunks: List[Tuple[int, Any]] = []
+        self._conn = None
+
+    def connection(self):
+        """Conexión DBAPI del escritor; se abre con el primer chunk y se conserva entre transacciones"""
+        if self._conn is None:
+            self._conn = self.engine.raw_connection()
+        return self._conn
+
+    def add(self, chunk_index: int, position: Any, row_count: int) -> bool:
+        """Registra un chunk ya escrito; devuelve True cuando la transacción alcanzó transaction_size filas"""
+        self.chunks.append((chunk_index, position))
+        self.rows += row_count
+        return self.rows >= self.transaction_size
+
+    def _reset(self) -> Tuple[List[Tuple[int, Any]], int]:
+        chunks, rows = self.chunks, self.rows
+        self.chunks, self.rows = [], 0
+        return chunks, rows
+
+    def commit(self) -> Tuple[List[Tuple[int, Any]], int]:
+        """Confirma la transacción; devuelve los chunks y filas confirmados"""
+        if self._conn is not None:
+            self._conn.commit()
+        return self._reset()
+
+    def rollback(self) -> Tuple[List[Tuple[int, Any]], int]:
+        """Revierte la transacción; devuelve los chunks y filas descartados"""
+        if self._conn is not None:
+            try:
+                self._conn.rollback()
+            except Exception as e:
+                # La conexión quedó inutilizable: se descarta y la siguiente transacción abre otra
+                logger.warning(f"No se pudo revertir la transacción del lote: {str(e)}")
+                self._discard_connection()
+        return self._reset()
+
+    def _discard_connection(self):
+        conn, self._conn = self._conn, None
+        try:
+            conn.invalidate()
+        except Exception:
+            pass
+
+    def close(self):
+        """Devuelve la conexión al pool; lo no confirmado (tras un error) se revierte"""
+        if self.chunks:
+            self.rollback()
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            conn.close()
+
+    def __len__(self) -> int:
+        return self.rows
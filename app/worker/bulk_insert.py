@@ -0,0 +1,118 @@
+# app/worker/bulk_insert.py
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import pyodbc
+except ImportError:  # El driver solo es necesario para la ruta fast_executemany
+    pyodbc = None
+
+logger = logging.getLogger(__name__)
+
+# Índices no agrupados y no únicos que pueden deshabilitarse durante una carga masiva
+NONCLUSTERED_INDEXES_QUERY = """
+SELECT i.name, i.is_disabled
+FROM sys.indexes i
+WHERE i.object_id = OBJECT_ID(:table_name)
+  AND i.type_desc = 'NONCLUSTERED'
+  AND i.is_unique = 0
+  AND i.is_primary_key = 0
+  AND i.is_hypothetical = 0
+ORDER BY i.index_id
+"""
+
+
+def split_table_name(table_name: str) -> Tuple[Optional[str], str]:
+    """Separa 'esquema.tabla' en (esquema, tabla); el esquema puede ser None"""
+    parts = [part.strip("[]") for part in table_name.split(".")]
+    if len(parts) == 1:
+        return None, parts[0]
+    return parts[-2], parts[-1]
+
+
+def positional_placeholder(paramstyle: str) -> str:
+    """Marcador de parámetro posicional del driver (? para pyodbc)"""
+    return "?" if paramstyle == "qmark" else "%s"
+
+
+def _input_size(data_type: str, length: Optional[int], precision: Optional[int],
+                scale: Optional[int], datetime_precision: Optional[int]) -> Any:
+    """Traduce un tipo de INFORMATION_SCHEMA a la tupla (tipo SQL, tamaño, decimales) de pyodbc"""
+    data_type = (data_type or "").lower()
+    is_max = length == -1
+
+    if data_type in ("varchar", "char"):
+        return (pyodbc.SQL_LONGVARCHAR, 0, 0) if is_max else (pyodbc.SQL_VARCHAR, length, 0)
+    if data_type in ("nvarchar", "nchar"):
+        return (pyodbc.SQL_WLONGVARCHAR, 0, 0) if is_max else (pyodbc.SQL_WVARCHAR, length, 0)
+    if data_type == "text":
+        return (pyodbc.SQL_LONGVARCHAR, 0, 0)
+    if data_type == "ntext":
+        return (pyodbc.SQL_WLONGVARCHAR, 0, 0)
+    if data_type in ("decimal", "numeric"):
+        return (pyodbc.SQL_DECIMAL, precision, scale or 0)
+    if data_type == "money":
+        return (pyodbc.SQL_DECIMAL, 19, 4)
+    if data_type == "smallmoney":
+        return (pyodbc.SQL_DECIMAL, 10, 4)
+    if data_type == "int":
+        return pyodbc.SQL_INTEGER
+    if data_type == "bigint":
+        return pyodbc.SQL_BIGINT
+    if data_type == "smallint":
+        return pyodbc.SQL_SMALLINT
+    if data_type == "tinyint":
+        return pyodbc.SQL_TINYINT
+    if data_type == "bit":
+        return pyodbc.SQL_BIT
+    if data_type == "float":
+        return pyodbc.SQL_DOUBLE
+    if data_type == "real":
+        return pyodbc.SQL_REAL
+    if data_type == "datetime":
+        return (pyodbc.SQL_TYPE_TIMESTAMP, 23, 3)
+    if data_type == "smalldatetime":
+        return (pyodbc.SQL_TYPE_TIMESTAMP, 16, 0)
+    if data_type == "datetime2":
+        digits = 7 if datetime_precision is None else datetime_precision
+        return (pyodbc.SQL_TYPE_TIMESTAMP, 20 + digits if digits else 19, digits)
+    if data_type == "date":
+        return (pyodbc.SQL_TYPE_DATE, 10, 0)
+    if data_type in ("varbinary", "binary"):
+        return (pyodbc.SQL_LONGVARBINARY, 0, 0) if is_max else (pyodbc.SQL_VARBINARY, length, 0)
+    if data_type == "image":
+        return (pyodbc.SQL_LONGVARBINARY, 0, 0)
+    if data_type == "uniqueidentifier":
+        return pyodbc.SQL_GUID
+    # Tipos no mapeados: pyodbc infiere el tipo del valor
+    return None
+
+
+def build_input_sizes(target_types: Dict[str, Tuple], dest_columns: Sequence[str]) -> List[Any]:
+    """Construye la lista para cursor.setinputsizes en el orden de las columnas destino"""
+    if pyodbc is None:
+        return []
+    types_upper = {name.upper(): info for name, info in target_types.items()}
+    sizes = []
+    for column in dest_columns:
+        info = types_upper.get(column.upper())
+        sizes.append(_input_size(*info) if info else None)
+    return sizes
+
+
+def executemany_insert(raw_conn, insert_query: str, rows: Sequence[tuple], fast: bool = True,
+                       input_sizes: Optional[List[Any]] = None) -> int:
+    """
+    Inserta tuplas posicionales con un cursor DBAPI de la conexión (fast_executemany de pyodbc
+    si fast) dentro de su transacción abierta: confirmar o revertir queda a cargo del llamador.
+    """
+    cursor = raw_conn.cursor()
+    try:
+        if fast:
+            cursor.fast_executemany = True
+            if input_sizes:
+                cursor.setinputsizes(input_sizes)
+        cursor.executemany(insert_query, rows)
+        return len(rows)
+    finally:
+        cursor.close()
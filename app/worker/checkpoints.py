@@ -0,0 +1,102 @@
+# app/worker/checkpoints.py
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+from app.core.database import SessionLocal, ensure_table
+from app.models.task import TransferCheckpoint
+from app.utils.helpers import to_jsonable
+
+logger = logging.getLogger(__name__)
+
+
+class CheckpointStore:
+    """
+    Guarda y recupera la última posición escrita de cada tabla de una transferencia.
+    Los fallos al guardar no detienen la transferencia: solo se pierde avance al reanudar.
+    """
+
+    def __init__(self, db_task_id: int, session_factory=SessionLocal):
+        self.db_task_id = db_task_id
+        self.session_factory = session_factory
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        """Checkpoints de la tarea indexados por tabla (o tabla#rango)"""
+        try:
+            db = self.session_factory()
+            try:
+                ensure_table(TransferCheckpoint, db.get_bind())
+                checkpoints = db.query(TransferCheckpoint).filter(
+                    TransferCheckpoint.task_id == self.db_task_id
+                ).all()
+                return {
+                    checkpoint.table_key: {
+                        "strategy": checkpoint.strategy,
+                        "position": checkpoint.position,
+                        "partition_range": checkpoint.partition_range,
+                        "chunk_index": checkpoint.chunk_index,
+                        "row_count": checkpoint.row_count,
+                        "status": checkpoint.status,
+                    }
+                    for checkpoint in checkpoints
+                }
+            finally:
+                db.close()
+        except Exception as e:
+            logger.error(f"Error leyendo checkpoints de la tarea {self.db_task_id}: {str(e)}")
+            return {}
+
+    def save(self, table_key: str, strategy: str, position: Optional[Dict], chunk_index: int,
+             row_count: int, status: str = "PROCESSING", partition_range: Optional[str] = None):
+        """Inserta o actualiza el checkpoint de una tabla"""
+        try:
+            db = self.session_factory()
+            try:
+                ensure_table(TransferCheckpoint, db.get_bind())
+                checkpoint = db.query(TransferCheckpoint).filter(
+                    TransferCheckpoint.task_id == self.db_task_id,
+                    TransferCheckpoint.table_key == table_key
+                ).first()
+                if checkpoint is None:
+                    checkpoint = TransferCheckpoint(task_id=self.db_task_id, table_key=table_key)
+                    db.add(checkpoint)
+                checkpoint.strategy = strategy
+                checkpoint.position = to_jsonable(position)
+                checkpoint.partition_range = partition_range
+                checkpoint.chunk_index = chunk_index
+                checkpoint.row_count = row_count
+                checkpoint.status = status
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+            finally:
+                db.close()
+        except Exception as e:
+            logger.error(f"Error guardando checkpoint {table_key} de la tarea {self.db_task_id}: {str(e)}")
+
+
+class ChunkWatermark:
+    """
+    Avanza la marca de agua solo sobre chunks contiguos terminados.
+    Con varios escritores los chunks terminan en desorden: el checkpoint nunca salta un hueco.
+    """
+
+    def __init__(self, next_index: int = 0, position: Any = None):
+        self.next_index = next_index
+        self.position = position
+        self.saved_index = next_index
+        self._done: Dict[int, Any] = {}
+        self._lock = threading.Lock()
+
+    def complete(self, chunk_index: int, position: Any) -> Optional[Any]:
+        """Marca un chunk como escrito; devuelve la nueva posición si la marca avanzó"""
+        with self._lock:
+            self._done[chunk_index] = position
+            advanced = None
+            while self.next_index in self._done:
+                advanced = self._done.pop(self.next_index)
+                self.next_index += 1
+            if advanced is not None:
+                self.position = advanced
+            return advanced
@@ -0,0 +1,23 @@
+# app/worker/chunk.py
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+
+class Chunk(NamedTuple):
+    """
+    Bloque de filas en formato columnar: lista fija de columnas + filas como tuplas.
+    Viaja del lector al escritor sin crear un diccionario por fila.
+    """
+    columns: Tuple[str, ...]
+    rows: List[tuple]
+    # Posición de reanudación después de este chunk (llave o filas leídas)
+    position: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def from_rows(cls, columns: Sequence[str], rows: Iterable[Sequence[Any]],
+                  position: Optional[Dict[str, Any]] = None) -> "Chunk":
+        """Convierte las filas del resultado (Row de SQLAlchemy) a tuplas una sola vez"""
+        return cls(tuple(columns), list(map(tuple, rows)), position)
+
+    @property
+    def row_count(self) -> int:
+        return len(self.rows)
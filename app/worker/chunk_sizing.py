@@ -0,0 +1,95 @@
+# app/worker/chunk_sizing.py
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+
+# Filas muestreadas para estimar bytes por fila
+ROW_SAMPLE_SIZE = 20
+# Cambios de tamaño que se conservan en table_details
+MAX_HISTORY = 50
+
+
+def estimate_row_bytes(rows: Sequence[tuple], sample: int = ROW_SAMPLE_SIZE) -> float:
+    """Estimación barata de bytes por fila: longitud de textos/binarios y 8 bytes para el resto"""
+    sampled = rows[:sample]
+    if not sampled:
+        return 0.0
+    total = 0
+    for row in sampled:
+        for value in row:
+            if isinstance(value, (str, bytes, bytearray)):
+                total += len(value)
+            elif value is not None:
+                total += 8
+    return total / len(sampled)
+
+
+class ChunkSizer:
+    """
+    Tamaño de chunk de una tabla. En modo adaptive mide segundos por fila (lectura + escritura)
+    y bytes por fila, y ajusta el tamaño para acercarse a target_seconds por chunk sin pasar
+    del techo de memoria. Cada ajuste está limitado a duplicar o reducir a la mitad.
+    """
+
+    def __init__(self, initial: int, adaptive: bool = False, min_size: int = 100, max_size: int = 50000,
+                 target_seconds: float = 2.0, memory_limit_bytes: Optional[int] = None, smoothing: float = 0.3):
+        self.min_size = min_size
+        self.max_size = max(min_size, max_size)
+        self.size = initial if not adaptive else min(max(initial, self.min_size), self.max_size)
+        self.adaptive = adaptive
+        self.target_seconds = target_seconds
+        self.memory_limit_bytes = memory_limit_bytes
+        self.smoothing = smoothing
+        self.read_seconds_per_row: Optional[float] = None
+        self.write_seconds_per_row: Optional[float] = None
+        self.bytes_per_row: Optional[float] = None
+        self.history: List[Dict[str, Any]] = [{"chunk": 0, "size": self.size}]
+        self._chunks_seen = 0
+        self._lock = threading.Lock()
+
+    def _ewma(self, current: Optional[float], value: float) -> float:
+        return value if current is None else current + self.smoothing * (value - current)
+
+    def observe_read(self, rows: Sequence[tuple], seconds: float):
+        """Registra la lectura de un chunk y recalcula el tamaño"""
+        if not self.adaptive or not rows:
+            return
+        with self._lock:
+            self._chunks_seen += 1
+            self.read_seconds_per_row = self._ewma(self.read_seconds_per_row, seconds / len(rows))
+            self.bytes_per_row = self._ewma(self.bytes_per_row, estimate_row_bytes(rows))
+            self._resize()
+
+    def observe_write(self, row_count: int, seconds: float):
+        """Registra la escritura (latencia del INSERT/MERGE) de un lote"""
+        if not self.adaptive or not row_count:
+            return
+        with self._lock:
+            self.write_seconds_per_row = self._ewma(self.write_seconds_per_row, seconds / row_count)
+            self._resize()
+
+    def _resize(self):
+        seconds_per_row = (self.read_seconds_per_row or 0.0) + (self.write_seconds_per_row or 0.0)
+        if seconds_per_row <= 0:
+            return
+        desired = self.target_seconds / seconds_per_row
+        if self.memory_limit_bytes and self.bytes_per_row:
+            desired = min(desired, self.memory_limit_bytes / self.bytes_per_row)
+        # Pasos acotados para no oscilar con mediciones ruidosas
+        desired = min(max(desired, self.size / 2), self.size * 2)
+        new_size = int(min(max(desired, self.min_size), self.max_size))
+        # Cambios menores al 10% no valen una consulta distinta
+        if abs(new_size - self.size) >= self.size * 0.1:
+            self.size = new_size
+            if len(self.history) < MAX_HISTORY:
+                self.history.append({"chunk": self._chunks_seen, "size": new_size})
+
+    def summary(self) -> Dict[str, Any]:
+        """Resumen para table_details"""
+        seconds_per_row = (self.read_seconds_per_row or 0.0) + (self.write_seconds_per_row or 0.0)
+        return {
+            "mode": "adaptive" if self.adaptive else "fixed",
+            "final_size": self.size,
+            "sizes": list(self.history),
+            "rows_per_sec": round(1 / seconds_per_row, 1) if seconds_per_row > 0 else None,
+            "bytes_per_row": round(self.bytes_per_row, 1) if self.bytes_per_row else None,
+        }
@@ -1,21 +1,38 @@
 # app/worker/database_worker.py
 import time
+import queue
 import logging
+import threading
 from datetime import datetime
-from typing import Dict, Any, List, Tuple, Optional
-from contextlib import contextmanager
-from fastapi import Depends
+from typing import Dict, Any, List, Sequence, Tuple, Optional
+from contextlib import closing, contextmanager
 from sqlalchemy import create_engine, text, exc
 from sqlalchemy.engine import Engine, CursorResult
-from app.core.database import SessionLocal, create_unified_engine, get_db, parse_sqlalchemy_error, test_connection
-from app.models.task import TaskStatus
+from app.core.config import settings
+from app.core.database import get_engine, parse_sqlalchemy_error
+from app.worker.bulk_insert import (
+    NONCLUSTERED_INDEXES_QUERY, build_input_sizes, executemany_insert, positional_placeholder
+)
+from app.utils.helpers import sql_literal
+from app.worker.batching import ChunkBatch
+from app.worker.checkpoints import CheckpointStore, ChunkWatermark
+from app.worker.progress import ProgressReporter, compact_table_status
+from app.worker.progress_events import ProgressPublisher
+from app.worker.row_counts import estimate_table_rows
+from app.worker.chunk import Chunk
+from app.worker.chunk_sizing import ChunkSizer
+from app.worker.schema_cache import column_types, schema_cache, unique_key_columns
+from app.worker.task_status import TaskStatusWriter
+from app.worker.unit_progress import UnitProgress
+from app.worker.upsert import merge_upsert
+from app.worker.watermarks import WatermarkStore, database_key
 from sqlalchemy.orm import Session
 
 # Configurar logging
 logger = logging.getLogger(__name__)
 
 class DataTransferWorker:
-    def __init__(self, transfer_config: Dict, db_task_id: int, celery_task: Any):
+    def __init__(self, transfer_config: Dict, db_task_id: int, celery_task: Any, report_status: bool = True):
         self.config = transfer_config
         self.db_task_id = db_task_id
         self.celery_task = celery_task
@@ -29,33 +46,51 @@ class DataTransferWorker:
             "errors": [],
             "warnings": [],
             "table_details": {},
+            "stage_timings": {},
             "start_time": datetime.now(),
             "end_time": None
         }
         self.current_table = None
+        self._insert_plans: Dict[str, Dict] = {}
+        self._stats_lock = threading.Lock()
+        self._table_start: Dict[str, float] = {}
+        # Checkpoints por chunk para reanudar (requiere el registro TaskStatus)
+        self.checkpoints = CheckpointStore(db_task_id) if db_task_id and self.config.get("checkpoint_interval", 1) else None
+        self._saved_checkpoints: Optional[Dict[str, Dict]] = None
+        self._watermarks: Dict[str, ChunkWatermark] = {}
+        self._chunk_sizers: Dict[str, ChunkSizer] = {}
+        self._checkpoint_lock = threading.Lock()
+        # Registro task_status escrito desde el worker (las subtareas distribuidas lo dejan al agregado)
+        self.status_writer = TaskStatusWriter(db_task_id) if db_task_id and report_status else None
+        self.publisher = ProgressPublisher(db_task_id) if db_task_id and report_status else None
+        # Subtareas del chord: publican el avance agregado de todas (lo asigna transfer_unit)
+        self.unit_progress: Optional[UnitProgress] = None
+        self.progress = ProgressReporter(
+            celery_task,
+            min_interval=settings.PROGRESS_MIN_INTERVAL_SECONDS,
+            min_delta=settings.PROGRESS_MIN_DELTA_PERCENT,
+            on_flush=self._flush_progress,
+        )
+        self.watermarks = WatermarkStore(self.config["source"], self.config["target"]) if "source" in self.config else None
 
     def connect_databases(self):
-        """Conecta a las bases de datos usando la función unificada con validación"""
+        """Obtiene los engines del registro por proceso y verifica cada conexión una vez"""
         try:
             logger.info("Iniciando conexiones a bases de datos...")
             
-            # Probar conexión source antes de crear el engine
-            source_test = test_connection(self.config["source"])
-            if not source_test["success"]:
-                raise ConnectionError(f"Error conectando a BD origen: {source_test['error']}")
-            
-            # Probar conexión target antes de crear el engine
-            target_test = test_connection(self.config["target"])
-            if not target_test["success"]:
-                raise ConnectionError(f"Error conectando a BD destino: {target_test['error']}")
-            
-            # Crear engines usando la función unificada
-            self.source_engine = create_unified_engine(self.config["source"])
-            self.target_engine = create_unified_engine(self.config["target"])
+            # Engines compartidos: transferencias repetidas reutilizan pools calientes
+            self.source_engine = get_engine(self.config["source"], **self.pool_options("source"))
+            self.target_engine = get_engine(self.config["target"], **self.pool_options("target"))
             
             # Verificar conexiones con consultas simples y manejo robusto
-            self._verify_connection(self.source_engine, "source")
-            self._verify_connection(self.target_engine, "target")
+            for engine, connection_name, label in (
+                (self.source_engine, "source", "origen"),
+                (self.target_engine, "target", "destino"),
+            ):
+                try:
+                    self._verify_connection(engine, connection_name)
+                except Exception as e:
+                    raise ConnectionError(f"Error conectando a BD {label}: {parse_sqlalchemy_error(e)}") from e
             
             logger.info("Conexiones establecidas correctamente")
             
@@ -65,6 +100,10 @@ class DataTransferWorker:
             self.disconnect()
             raise
 
+    def pool_options(self, role: str) -> Dict[str, int]:
+        """Opciones de pool para el engine source/target (el worker secuencial usa las de defecto)"""
+        return {}
+
     def _verify_connection(self, engine: Engine, connection_name: str):
         """Verificar conexión individual con manejo robusto"""
         try:
@@ -84,16 +123,10 @@ class DataTransferWorker:
             raise
 
     def disconnect(self):
-        """Cierra las conexiones a las bases de datos"""
-        try:
-            if self.source_engine:
-                self.source_engine.dispose()
-                logger.info("Conexión source cerrada")
-            if self.target_engine:
-                self.target_engine.dispose()
-                logger.info("Conexión target cerrada")
-        except Exception as e:
-            logger.warning(f"Error cerrando conexiones: {str(e)}")
+        """Libera las referencias a los engines (los pools quedan en el registro del proceso)"""
+        self.source_engine = None
+        self.target_engine = None
+        logger.info("Conexiones liberadas")
 
     @contextmanager
     def safe_connection(self, engine: Engine):
@@ -148,13 +181,9 @@ class DataTransferWorker:
             except exc.DisconnectionError as e:
                 logger.warning(f"Desconexión detectada (intento {attempt + 1}/{max_retries}): {str(e)}")
                 if attempt < max_retries - 1:
+                    # El pool ya invalidó la conexión rota; el engine es compartido (registro
+                    # del proceso) y no se libera aquí: el reintento toma una conexión nueva
                     time.sleep(retry_delay)
-                    # Recrear engine si es necesario
-                    try:
-                        engine.dispose()
-                        time.sleep(1)
-                    except:
-                        pass
                     continue
                 else:
                     raise
@@ -192,47 +221,250 @@ class DataTransferWorker:
         if table_config.get("order_by"):
             query += f" ORDER BY {table_config['order_by']}"
         
-        # Aplicar TOP (límite de filas) si existe (MSSQL específico)
+        # Aplicar TOP (límite de filas) si existe (MSSQL específico); en la misma consulta que el
+        # ORDER BY: una subconsulta ordenada sin TOP no es válida en SQL Server
         if table_config.get("row_limit"):
-            query = f"SELECT TOP {table_config['row_limit']} * FROM ({query}) AS limited_query"
+            query = f"SELECT TOP ({table_config['row_limit']}) {query[len('SELECT '):]}"
         
         return query
 
-    def get_table_columns(self, table_config: Dict) -> List[str]:
-        """Obtener columnas de la tabla de forma segura"""
+    def build_offset_query(self, table_config: Dict, offset: int, fetch: Optional[int] = None) -> str:
+        """
+        Página OFFSET/FETCH en el orden de la tabla (order_by o sin orden definido); con
+        row_limit las páginas se acotan a las primeras row_limit filas de ese orden.
+        """
+        query = self.build_select_query({**table_config, "order_by": None, "row_limit": None})
+        query += f" ORDER BY {table_config.get('order_by') or '(SELECT NULL)'} OFFSET {offset} ROWS"
+        row_limit = table_config.get("row_limit")
+        if row_limit:
+            fetch = row_limit - offset if fetch is None else min(fetch, row_limit - offset)
+        if fetch is not None:
+            query += f" FETCH NEXT {max(fetch, 0)} ROWS ONLY"
+        return query
+
+    def _db_key(self, engine: Optional[Engine]) -> str:
+        """Llave de la caché de esquemas para el engine origen o destino"""
+        role = "target" if engine is not None and engine is self.target_engine else "source"
+        return database_key(self.config[role])
+
+    def get_table_schema(self, table_name: str, engine: Optional[Engine] = None) -> Optional[Dict[str, Any]]:
+        """Metadatos de la tabla (origen por defecto) desde la caché por proceso"""
+        engine = engine or self.source_engine
+        return schema_cache.get(engine, self._db_key(engine), table_name)
+
+    def preload_schemas(self):
+        """Carga en bloque los metadatos de todas las tablas del request: una consulta por base"""
+        tables = self.config["tables"]
+        if self.config.get("refresh_schema", False):
+            for role in ("source", "target"):
+                schema_cache.invalidate(database_key(self.config[role]))
+        for engine, names in (
+            (self.source_engine, [tc["source_table"] for tc in tables]),
+            (self.target_engine, [tc.get("target_table") or tc["source_table"] for tc in tables]),
+        ):
+            try:
+                schema_cache.load(engine, self._db_key(engine), names)
+            except Exception as e:
+                # Cada tabla se consultará por separado cuando se necesite
+                logger.warning(f"No se precargaron esquemas: {str(e)}")
+
+    def get_key_columns(self, table_config: Dict, engine: Optional[Engine] = None,
+                        table_name: Optional[str] = None) -> List[str]:
+        """Obtener la llave primaria o un índice único (sin columnas NULL) de la tabla origen (o de la indicada)"""
+        schema = self.get_table_schema(table_name or table_config["source_table"], engine)
+        return unique_key_columns(schema) if schema is not None else []
+
+    def count_rows(self, table_config: Dict, select_query: str) -> Tuple[int, str]:
+        """
+        Filas a transferir y su origen ("estimate" o "exact"). En count_mode=auto una tabla sin
+        where_clause usa los metadatos de particiones en vez de recorrerla con COUNT(*).
+        """
+        if self.config.get("count_mode", "auto") == "auto":
+            # Rangos de una tabla particionada: el planificador ya repartió la estimación
+            if table_config.get("estimated_rows") is not None:
+                return table_config["estimated_rows"], "estimate"
+            if not table_config.get("where_clause"):
+                estimate = estimate_table_rows(self.source_engine, table_config["source_table"])
+                if estimate is not None:
+                    if table_config.get("row_limit"):
+                        estimate = min(estimate, table_config["row_limit"])
+                    return estimate, "estimate"
+        
+        count_query = f"SELECT COUNT(*) FROM ({select_query}) AS total_rows"
+        return self.execute_query_safe(self.source_engine, count_query), "exact"
+
+    def _resolve_chunking(self, table_config: Dict) -> Tuple[str, List[str]]:
+        """Decide la estrategia de paginación: keyset si existe llave utilizable, si no OFFSET"""
+        chunking = table_config.get("chunking") or "auto"
+        if chunking == "offset":
+            return "offset", []
+        # El orden por llave cambiaría qué filas entran en row_limit y el orden pedido
+        if table_config.get("order_by") or table_config.get("row_limit"):
+            if chunking == "keyset":
+                logger.warning(f"Tabla {table_config['source_table']} con order_by/row_limit, usando OFFSET")
+            return "offset", []
+        
         try:
-            # Consulta para obtener solo los nombres de columnas
-            column_query = f"""
-            SELECT COLUMN_NAME 
-            FROM INFORMATION_SCHEMA.COLUMNS 
-            WHERE TABLE_NAME = '{table_config['source_table']}'
-            ORDER BY ORDINAL_POSITION
-            """
-            
-            result_data = self.execute_query_safe(self.source_engine, column_query)
-            columns = [row[0] for row in result_data["rows"]]
-            
-            if not columns:
-                # Fallback: usar consulta con LIMIT 0
-                select_query = self.build_select_query(table_config)
-                limited_query = f"SELECT TOP 0 * FROM ({select_query}) AS column_check"
-                result_data = self.execute_query_safe(self.source_engine, limited_query)
-                columns = result_data["columns"]
-            
-            return columns
-            
+            key_columns = table_config.get("key_columns") or self.get_key_columns(table_config)
         except Exception as e:
-            logger.error(f"Error obteniendo columnas: {str(e)}")
-            raise
+            logger.warning(f"No se pudo detectar la llave de {table_config['source_table']}: {str(e)}")
+            key_columns = []
+        
+        # La llave debe formar parte de las columnas seleccionadas
+        selected = table_config.get("selected_columns")
+        if selected:
+            selected_upper = {col.upper() for col in selected}
+            if any(col.upper() not in selected_upper for col in key_columns):
+                key_columns = []
+        
+        if not key_columns:
+            if chunking == "keyset":
+                logger.warning(f"Tabla {table_config['source_table']} sin llave utilizable, usando OFFSET")
+            return "offset", []
+        return "keyset", key_columns
+
+    def _keyset_predicate(self, key_columns: List[str]) -> str:
+        """
+        (k1 > :last_0) OR (k1 = :last_0 AND k2 > :last_1) ... para continuar tras la última llave.
+        Con llave compuesta se antepone k1 >= :last_0: SQL Server no convierte la expansión OR
+        en un seek, y sin esa cota cada chunk recorre el índice desde el inicio.
+        """
+        quoted = [f"[{col}]" for col in key_columns]
+        predicates = []
+        for i, col in enumerate(quoted):
+            terms = [f"{quoted[j]} = :last_{j}" for j in range(i)]
+            terms.append(f"{col} > :last_{i}")
+            predicates.append("(" + " AND ".join(terms) + ")")
+        if len(quoted) == 1:
+            return predicates[0]
+        return f"{quoted[0]} >= :last_0 AND (" + " OR ".join(predicates) + ")"
+
+    def build_keyset_query(self, base_query: str, key_columns: List[str], chunk_size: int, first_chunk: bool) -> str:
+        """Construye la consulta de un chunk continuando desde la última llave leída"""
+        query = f"SELECT TOP ({chunk_size}) * FROM ({base_query}) AS src"
+        if not first_chunk:
+            query += " WHERE " + self._keyset_predicate(key_columns)
+        query += " ORDER BY " + ", ".join(f"[{col}]" for col in key_columns)
+        return query
+
+    def _key_positions(self, columns: List[str], key_columns: List[str]) -> List[int]:
+        """Posición de cada columna llave dentro de las columnas del resultado"""
+        columns_upper = [col.upper() for col in columns]
+        return [columns_upper.index(col.upper()) for col in key_columns]
+
+    def _iter_keyset_chunks(self, table_config: Dict, key_columns: List[str], sizer: ChunkSizer,
+                            start: Optional[Dict] = None):
+        """
+        Genera Chunks usando WHERE llave > :última ORDER BY llave.
+        La posición {"last_key", "rows"} permite reanudar después del chunk.
+        Solo sin order_by ni row_limit (ver _resolve_chunking): el orden lo impone la llave.
+        """
+        base_query = self.build_select_query(table_config)
+        rows_read = (start or {}).get("rows", 0)
+        last_key: Optional[Dict[str, Any]] = (start or {}).get("last_key")
+        key_positions: Optional[List[int]] = None
+        
+        while True:
+            size = sizer.size
+            chunk_query = self.build_keyset_query(base_query, key_columns, size, last_key is None)
+            chunk_result = self.execute_query_safe(self.source_engine, chunk_query, last_key)
+            chunk_rows = chunk_result["rows"]
+            
+            if not chunk_rows:
+                break
+            
+            columns = chunk_result["columns"]
+            if key_positions is None:
+                key_positions = self._key_positions(columns, key_columns)
+            
+            last_row = chunk_rows[-1]
+            last_key = {f"last_{i}": last_row[pos] for i, pos in enumerate(key_positions)}
+            rows_read += len(chunk_rows)
+            
+            yield Chunk.from_rows(columns, chunk_rows, {"last_key": last_key, "rows": rows_read})
+            
+            if len(chunk_rows) < size:
+                break
+
+    def _iter_offset_chunks(self, table_config: Dict, sizer: ChunkSizer, start: Optional[Dict] = None):
+        """Genera Chunks con OFFSET/FETCH cuando no hay llave utilizable (o se pidió order_by/row_limit)"""
+        offset = (start or {}).get("rows", 0)
+        row_limit = table_config.get("row_limit")
+        while row_limit is None or offset < row_limit:
+            chunk_size = sizer.size if row_limit is None else min(sizer.size, row_limit - offset)
+            chunk_query = self.build_offset_query(table_config, offset, chunk_size)
+            chunk_result = self.execute_query_safe(self.source_engine, chunk_query)
+            chunk_rows = chunk_result["rows"]
+            
+            if not chunk_rows:
+                logger.info(f"No hay más datos en offset {offset}")
+                break
+            
+            yield Chunk.from_rows(chunk_result["columns"], chunk_rows, {"rows": offset + len(chunk_rows)})
+            
+            if len(chunk_rows) < chunk_size:
+                break
+            offset += len(chunk_rows)
+
+    def build_stream_query(self, table_config: Dict, key_columns: List[str], start: Optional[Dict] = None) -> str:
+        """Construye el SELECT único para lectura en streaming, ordenado por llave si existe"""
+        rows_read = (start or {}).get("rows", 0)
+        
+        if not key_columns:
+            if not rows_read:
+                return self.build_select_query(table_config)
+            # Reanudación sin llave: saltar las filas ya procesadas en el mismo orden
+            return self.build_offset_query(table_config, rows_read)
+        
+        # Con llave no hay order_by ni row_limit (ver _resolve_chunking)
+        base_query = self.build_select_query(table_config)
+        where = f" WHERE {self._keyset_predicate(key_columns)}" if (start or {}).get("last_key") else ""
+        order = ", ".join(f"[{col}]" for col in key_columns)
+        return f"SELECT * FROM ({base_query}) AS src{where} ORDER BY {order}"
+
+    def _iter_stream_chunks(self, table_config: Dict, key_columns: List[str], sizer: ChunkSizer,
+                            start: Optional[Dict] = None):
+        """Ejecuta el SELECT una sola vez y entrega Chunks con fetchmany"""
+        stream_query = self.build_stream_query(table_config, key_columns, start)
+        logger.debug(f"Query streaming: {stream_query}")
+        rows_read = (start or {}).get("rows", 0)
+        
+        # Una sola conexión y compilación; el cursor entrega filas bajo demanda
+        with self.source_engine.connect() as conn:
+            result = conn.execution_options(
+                stream_results=True, yield_per=sizer.size
+            ).execute(text(stream_query), (start or {}).get("last_key") or {})
+            try:
+                columns = tuple(result.keys())
+                key_positions = self._key_positions(columns, key_columns) if key_columns else []
+                while True:
+                    chunk_rows = result.fetchmany(sizer.size)
+                    if not chunk_rows:
+                        break
+                    rows_read += len(chunk_rows)
+                    position = {"rows": rows_read}
+                    if key_positions:
+                        last_row = chunk_rows[-1]
+                        position["last_key"] = {f"last_{i}": last_row[pos] for i, pos in enumerate(key_positions)}
+                    yield Chunk.from_rows(columns, chunk_rows, position)
+            finally:
+                result.close()
+
+    def _stats_key(self, table_config: Dict) -> str:
+        """Clave en table_details: la tabla, o tabla#n para un rango de una tabla particionada"""
+        if table_config.get("partition_of"):
+            return f"{table_config['partition_of']}#{table_config['partition_index']}"
+        return table_config["source_table"]
 
     def transfer_table_data(self, table_config: Dict):
         """Transferencia completa para una tabla individual con manejo robusto"""
-        table_name = table_config["source_table"]
+        table_name = self._stats_key(table_config)
+        is_partition = bool(table_config.get("partition_of"))
         self.current_table = table_name
         logger.info(f"Procesando tabla: {table_name}")
         
         # Inicializar estadísticas de la tabla
-        self.stats["table_details"][table_name] = {
+        table_stats = {
             "status": "PROCESSING",
             "total_rows": 0,
             "transferred": 0,
@@ -240,98 +472,118 @@ class DataTransferWorker:
             "end_time": None,
             "errors": 0
         }
-        table_stats = self.stats["table_details"][table_name]
+        if table_config.get("sync_watermark"):
+            table_stats["sync_watermark"] = table_config["sync_watermark"]
+        disabled_indexes: List[str] = []
+        with self._stats_lock:
+            self.stats["table_details"][table_name] = table_stats
         
         try:
+            checkpoint = self._load_checkpoint(table_config)
+            if checkpoint and checkpoint["status"] == "COMPLETED":
+                # Tabla terminada en la ejecución anterior: no se vuelve a copiar
+                row_count = checkpoint["row_count"]
+                table_stats.update(status="COMPLETED", total_rows=row_count, transferred=row_count, resumed_from=row_count)
+                with self._stats_lock:
+                    self.stats["total_rows"] += row_count
+                    self.stats["transferred_rows"] += row_count
+                    if not is_partition:
+                        self.stats["completed_tables"] += 1
+                logger.info(f"Tabla {table_name} completada en la ejecución anterior, omitiendo")
+                return
+            
+            # truncate vacía el destino una sola vez: ni por rango ni al reanudar una tabla con avance
+            if table_config.get("write_mode") == "truncate" and not is_partition and not (checkpoint and checkpoint.get("position")):
+                self.truncate_target(table_config)
+            
+            # Índices no agrupados fuera durante la carga (en tablas particionadas lo hace el planificador)
+            if self.config.get("disable_indexes", False) and not is_partition:
+                disabled_indexes = self.disable_target_indexes(table_config)
+                table_stats["disabled_indexes"] = disabled_indexes
+            
             # Construir consulta SELECT
             select_query = self.build_select_query(table_config)
             logger.debug(f"Query SELECT: {select_query}")
             
-            # Obtener total de filas de forma segura
-            count_query = f"SELECT COUNT(*) FROM ({select_query}) AS total_rows"
-            total_rows = self.execute_query_safe(self.source_engine, count_query)
+            # Total de filas: estimación de metadatos o COUNT(*) exacto si hay filtro
+            # (sin TOP, el ORDER BY no es válido dentro del COUNT y no cambia el total)
+            count_query = select_query if table_config.get("row_limit") else self.build_select_query({**table_config, "order_by": None})
+            total_rows, count_source = self.count_rows(table_config, count_query)
             
             table_stats["total_rows"] = total_rows
-            self.stats["total_rows"] += total_rows
-            logger.info(f"Tabla {table_name}: {total_rows} filas a transferir")
+            table_stats["row_count_source"] = count_source
+            with self._stats_lock:
+                self.stats["total_rows"] += total_rows
+            logger.info(f"Tabla {table_name}: {total_rows} filas a transferir ({count_source})")
             
-            if total_rows == 0:
+            # Una estimación en 0 puede estar desactualizada: el ciclo termina al leer un chunk vacío
+            if total_rows == 0 and count_source == "exact":
                 logger.info(f"Tabla {table_name} está vacía, omitiendo transferencia")
                 table_stats["status"] = "COMPLETED"
-                self.stats["completed_tables"] += 1
+                if not is_partition:
+                    with self._stats_lock:
+                        self.stats["completed_tables"] += 1
                 return
             
-            # Obtener columnas de forma segura
-            source_columns = self.get_table_columns(table_config)
-            logger.debug(f"Columnas detectadas: {source_columns}")
+            # Determinar estrategia de paginación (llave o OFFSET)
+            strategy, key_columns = self._resolve_chunking(table_config)
+            table_stats["chunking_strategy"] = strategy
+            table_stats["key_columns"] = key_columns
+            logger.info(f"Tabla {table_name}: paginación por {strategy} {key_columns or ''}")
+            
+            # Reanudar desde el último checkpoint si corresponde a la misma estrategia
+            start, first_index = None, 0
+            if checkpoint and checkpoint.get("position"):
+                if checkpoint["strategy"] == strategy:
+                    start, first_index = checkpoint["position"], checkpoint["chunk_index"]
+                    resumed_rows = checkpoint["row_count"]
+                    table_stats["resumed_from"] = resumed_rows
+                    table_stats["transferred"] = resumed_rows
+                    with self._stats_lock:
+                        self.stats["transferred_rows"] += resumed_rows
+                    logger.info(f"Tabla {table_name}: reanudando en chunk {first_index} ({resumed_rows} filas ya copiadas)")
+                else:
+                    logger.warning(f"Tabla {table_name}: checkpoint con estrategia {checkpoint['strategy']} ignorado")
+                    if table_config.get("write_mode") == "truncate" and not is_partition:
+                        # Se copia de nuevo desde el inicio
+                        self.truncate_target(table_config)
+            self._watermarks[table_name] = ChunkWatermark(first_index, start)
             
             # Transferir datos por chunks
-            chunk_size = self.config["chunk_size"]
-            transferred = 0
-            start_time = time.time()
+            sizer = self._chunk_sizers[table_name] = self.create_chunk_sizer()
+            self._table_start[table_name] = time.time()
+            table_stats["stage_timings"] = {"read": 0.0, "write": 0.0, "queue_wait": 0.0}
             
-            # Procesar en chunks con OFFSET/FETCH
-            for offset in range(0, total_rows, chunk_size):
-                try:
-                    chunk_query = f"""
-                    SELECT * FROM (
-                        {select_query}
-                    ) AS src
-                    ORDER BY (SELECT NULL)
-                    OFFSET {offset} ROWS
-                    FETCH NEXT {chunk_size} ROWS ONLY
-                    """
-                    
-                    # Obtener chunk de datos
-                    chunk_result = self.execute_query_safe(self.source_engine, chunk_query)
-                    chunk_rows = chunk_result["rows"]
-                    
-                    if not chunk_rows:
-                        logger.info(f"No hay más datos en offset {offset}")
-                        break
-                    
-                    # Convertir a formato para inserción
-                    chunk_data = []
-                    for row in chunk_rows:
-                        row_dict = {col: val for col, val in zip(source_columns, row)}
-                        chunk_data.append(row_dict)
-                    
-                    # Insertar chunk en destino
-                    self.insert_chunk_safe(table_config, source_columns, chunk_data)
-                    
-                    # Actualizar estadísticas
-                    transferred += len(chunk_data)
-                    table_stats["transferred"] = transferred
-                    self.stats["transferred_rows"] += len(chunk_data)
-                    
-                    # Calcular rendimiento
-                    elapsed = time.time() - start_time
-                    rows_per_sec = transferred / elapsed if elapsed > 0 else 0
-                    
-                    if transferred % (chunk_size * 5) == 0:  # Log cada 5 chunks
-                        logger.info(f"{table_name}: {transferred}/{total_rows} filas ({rows_per_sec:.1f} filas/seg)")
-                    
-                    # Actualizar progreso
-                    self._update_progress()
-                    
-                except Exception as e:
-                    error_detail = parse_sqlalchemy_error(e) if isinstance(e, exc.SQLAlchemyError) else {"message": str(e)}
-                    
-                    if self.config.get("skip_errors", False):
-                        logger.warning(f"Error en chunk {offset//chunk_size}: {error_detail['message']}")
-                        table_stats["errors"] += len(chunk_data) if 'chunk_data' in locals() else chunk_size
-                        self.stats["warnings"].append({
-                            "table": table_name,
-                            "chunk": offset // chunk_size,
-                            "error": error_detail
-                        })
-                        continue
-                    else:
-                        raise
+            read_mode = self.config.get("read_mode", "chunked")
+            table_stats["read_mode"] = read_mode
+            
+            if read_mode == "stream":
+                chunks = self._iter_stream_chunks(table_config, key_columns, sizer, start)
+            elif strategy == "keyset":
+                chunks = self._iter_keyset_chunks(table_config, key_columns, sizer, start)
+            else:
+                chunks = self._iter_offset_chunks(table_config, sizer, start)
+            
+            with closing(chunks):
+                if self.config.get("pipeline", False):
+                    self._transfer_chunks_pipelined(table_config, table_stats, chunks, first_index)
+                else:
+                    self._transfer_chunks_serial(table_config, table_stats, chunks, first_index)
+            
+            transferred = table_stats["transferred"]
+            if count_source == "estimate":
+                # Sustituir la estimación por las filas realmente procesadas
+                processed = transferred + table_stats["errors"]
+                with self._stats_lock:
+                    self.stats["total_rows"] += processed - total_rows
+                    table_stats["total_rows"] = total_rows = processed
             
             # Finalización exitosa
             table_stats["status"] = "COMPLETED"
-            self.stats["completed_tables"] += 1
+            self._save_checkpoint(table_config, strategy, "COMPLETED")
+            if not is_partition:
+                with self._stats_lock:
+                    self.stats["completed_tables"] += 1
             logger.info(f"Tabla {table_name} completada: {transferred}/{total_rows} filas")
             
         except Exception as e:
@@ -340,45 +592,447 @@ class DataTransferWorker:
             error_msg = f"Error en tabla {table_name}: {error_detail.get('message', str(e))}"
             logger.error(error_msg)
             
-            table_stats["status"] = "FAILED"
-            table_stats["error"] = error_detail
-            self.stats["errors"].append({
-                "table": table_name,
-                "error": error_detail
-            })
+            with self._stats_lock:
+                table_stats["status"] = "FAILED"
+                table_stats["error"] = error_detail
+                self.stats["errors"].append({
+                    "table": table_name,
+                    "error": error_detail
+                })
             
             if not self.config.get("skip_errors", False):
                 raise
             else:
-                self.stats["completed_tables"] += 1
+                if not is_partition:
+                    with self._stats_lock:
+                        self.stats["completed_tables"] += 1
                 logger.warning(f"Tabla {table_name} omitida debido a errores")
         
         finally:
+            if disabled_indexes:
+                self.rebuild_target_indexes(table_config, disabled_indexes)
+            if table_name in self._chunk_sizers:
+                table_stats["chunk_sizing"] = self._chunk_sizers.pop(table_name).summary()
             table_stats["end_time"] = datetime.now()
-            self._update_progress()
+            if "stage_timings" in table_stats:
+                table_stats["stage_timings"] = {
+                    stage: round(seconds, 3) for stage, seconds in table_stats["stage_timings"].items()
+                }
+            self._update_progress(force=True)
+
+    def _add_stage_time(self, table_stats: Dict, stage: str, seconds: float):
+        """Acumula el tiempo de una etapa (lectura, escritura, espera en cola)"""
+        with self._stats_lock:
+            table_stats["stage_timings"][stage] += seconds
+            self.stats["stage_timings"][stage] = self.stats["stage_timings"].get(stage, 0.0) + seconds
+
+    def create_chunk_sizer(self) -> ChunkSizer:
+        """Controlador de tamaño de chunk para una tabla según chunk_sizing del request"""
+        memory_mb = self.config.get("chunk_memory_mb")
+        return ChunkSizer(
+            self.config["chunk_size"],
+            adaptive=self.config.get("chunk_sizing", "fixed") == "adaptive",
+            min_size=self.config.get("chunk_size_min", 100),
+            max_size=self.config.get("chunk_size_max", 50000),
+            target_seconds=self.config.get("target_chunk_seconds", 2.0),
+            memory_limit_bytes=memory_mb * 1024 * 1024 if memory_mb else None,
+        )
 
-    def insert_chunk_safe(self, table_config: Dict, columns: List[str], chunk_data: List[Dict]):
-        """Insertar chunk de datos de forma segura"""
-        target_table = table_config.get("target_table", table_config['source_table'])
+    def _read_chunk(self, table_config: Dict, table_stats: Dict, chunk_iter) -> Optional[Chunk]:
+        """Lee el siguiente chunk midiendo la etapa de lectura; None al terminar"""
+        read_start = time.perf_counter()
+        chunk = next(chunk_iter, None)
+        read_seconds = time.perf_counter() - read_start
+        self._add_stage_time(table_stats, "read", read_seconds)
+        if chunk is not None:
+            self._chunk_sizers[self._stats_key(table_config)].observe_read(chunk.rows, read_seconds)
+        return chunk
+
+    def _write_chunk(self, table_config: Dict, table_stats: Dict, batch: ChunkBatch, chunk_index: int, chunk: Chunk):
+        """Escribe el chunk en la transacción abierta del escritor y confirma cada transaction_size filas"""
+        table_name = self._stats_key(table_config)
+        try:
+            write_start = time.perf_counter()
+            insert_mode = self.insert_chunk_safe(table_config, chunk.columns, chunk.rows, batch)
+            write_seconds = time.perf_counter() - write_start
+            self._add_stage_time(table_stats, "write", write_seconds)
+            self._chunk_sizers[table_name].observe_write(len(chunk.rows), write_seconds)
+        except Exception as e:
+            batch.add(chunk_index, chunk.position, len(chunk.rows))
+            self._fail_batch(table_config, table_stats, batch, e)
+            return
         
-        # Aplicar mapeo de columnas si existe
-        column_mappings = table_config.get("column_mappings", {})
-        logger.info('column_mappings',column_mappings)
-        dest_columns = [column_mappings.get(col, col) for col in columns]
+        with self._stats_lock:
+            table_stats["insert_mode"] = insert_mode
+        # El MERGE de upsert confirma en su propia conexión: el chunk queda aplicado al volver
+        if batch.add(chunk_index, chunk.position, len(chunk.rows)) or table_config.get("write_mode") == "upsert":
+            self._commit_batch(table_config, table_stats, batch)
+
+    def _commit_batch(self, table_config: Dict, table_stats: Dict, batch: ChunkBatch):
+        """Confirma la transacción del escritor, actualiza estadísticas y avanza el checkpoint"""
+        if not batch.chunks:
+            return
+        table_name = self._stats_key(table_config)
+        try:
+            commit_start = time.perf_counter()
+            chunks, rows = batch.commit()
+            self._add_stage_time(table_stats, "write", time.perf_counter() - commit_start)
+        except Exception as e:
+            self._fail_batch(table_config, table_stats, batch, e)
+            return
         
-        # Construir consulta INSERT
-        placeholders = ", ".join([f":{col}" for col in columns])
-        columns_str = ", ".join(dest_columns)
-        insert_query = f"INSERT INTO {target_table} ({columns_str}) VALUES ({placeholders})"
+        with self._stats_lock:
+            table_stats["transferred"] += rows
+            table_stats["commits"] = table_stats.get("commits", 0) + 1
+            self.stats["transferred_rows"] += rows
+            transferred = table_stats["transferred"]
+        
+        if any((chunk_index + 1) % 5 == 0 for chunk_index, _ in chunks):  # Log cada 5 chunks
+            elapsed = time.time() - self._table_start[table_name]
+            rows_per_sec = transferred / elapsed if elapsed > 0 else 0
+            logger.info(f"{table_name}: {transferred}/{table_stats['total_rows']} filas ({rows_per_sec:.1f} filas/seg)")
         
-        # Ejecutar inserción con manejo de transacción
+        # Transacción confirmada: la posición puede avanzar
+        for chunk_index, position in chunks:
+            self._chunk_done(table_config, table_stats, chunk_index, position)
+
+    def _fail_batch(self, table_config: Dict, table_stats: Dict, batch: ChunkBatch, error: Exception):
+        """
+        Revierte la transacción del escritor: sus chunks ya no están en memoria, así que fallan
+        juntos. Con skip_errors cuentan como errores y la posición avanza; si no, se propaga.
+        """
+        chunks, rows = batch.rollback()
+        if not self.config.get("skip_errors", False):
+            raise error
+        table_name = self._stats_key(table_config)
+        error_detail = parse_sqlalchemy_error(error) if isinstance(error, exc.SQLAlchemyError) else {"message": str(error)}
+        chunk_indexes = [chunk_index for chunk_index, _ in chunks]
+        logger.warning(f"Error en chunks {chunk_indexes}: {error_detail['message']}")
+        with self._stats_lock:
+            table_stats["errors"] += rows
+            self.stats["warnings"].extend(
+                {"table": table_name, "chunk": chunk_index, "error": error_detail}
+                for chunk_index in chunk_indexes
+            )
+        
+        # Transacción omitida por skip_errors: la posición puede avanzar
+        for chunk_index, position in chunks:
+            self._chunk_done(table_config, table_stats, chunk_index, position)
+
+    def _transfer_chunks_serial(self, table_config: Dict, table_stats: Dict, chunks, first_index: int = 0):
+        """Lee cada chunk, lo escribe en la transacción abierta y confirma cada transaction_size filas"""
+        batch = ChunkBatch(self.target_engine, self.config.get("transaction_size", 1000))
+        chunk_iter = iter(chunks)
+        chunk_index = first_index
         try:
-            with self.safe_connection(self.target_engine) as conn:
-                conn.execute(text(insert_query), chunk_data)
+            while True:
+                chunk = self._read_chunk(table_config, table_stats, chunk_iter)
+                if chunk is None:
+                    break
                 
+                self._write_chunk(table_config, table_stats, batch, chunk_index, chunk)
+                chunk_index += 1
+                self._update_progress()
+            
+            self._commit_batch(table_config, table_stats, batch)
+        finally:
+            batch.close()
+
+    def _transfer_chunks_pipelined(self, table_config: Dict, table_stats: Dict, chunks, first_index: int = 0):
+        """Etapa lectora y N escritoras unidas por una cola acotada: lee el chunk N+1 mientras se escribe el N"""
+        queue_depth = self.config.get("queue_depth", 2)
+        writer_count = self.config.get("writer_count", 1)
+        if self.config.get("table_lock", False) and writer_count > 1:
+            # Con TABLOCK los escritores se bloquearían entre sí
+            logger.info("table_lock activo: se usa un solo escritor")
+            writer_count = 1
+        transaction_size = self.config.get("transaction_size", 1000)
+        chunk_queue: queue.Queue = queue.Queue(maxsize=queue_depth)
+        writer_errors: List[Exception] = []
+        stop_event = threading.Event()
+        
+        def writer_stage():
+            # Cada escritor mantiene su propia transacción abierta en su conexión
+            batch = ChunkBatch(self.target_engine, transaction_size)
+            try:
+                while True:
+                    item = chunk_queue.get()
+                    try:
+                        if item is None:
+                            if not stop_event.is_set():
+                                self._commit_batch(table_config, table_stats, batch)
+                            return
+                        # Tras un error se drena la cola sin escribir para liberar al lector
+                        if not stop_event.is_set():
+                            self._write_chunk(table_config, table_stats, batch, *item)
+                    except Exception as e:
+                        writer_errors.append(e)
+                        stop_event.set()
+                    finally:
+                        chunk_queue.task_done()
+            finally:
+                batch.close()
+        
+        writers = [
+            threading.Thread(target=writer_stage, name=f"writer-{table_config['source_table']}-{i}", daemon=True)
+            for i in range(writer_count)
+        ]
+        for writer in writers:
+            writer.start()
+        
+        try:
+            chunk_iter = iter(chunks)
+            chunk_index = first_index
+            while not stop_event.is_set():
+                chunk = self._read_chunk(table_config, table_stats, chunk_iter)
+                if chunk is None:
+                    break
+                
+                # put() bloquea cuando la cola está llena (escritores más lentos que el lector)
+                wait_start = time.perf_counter()
+                chunk_queue.put((chunk_index, chunk))
+                self._add_stage_time(table_stats, "queue_wait", time.perf_counter() - wait_start)
+                chunk_index += 1
+                self._update_progress()
+        finally:
+            for _ in writers:
+                chunk_queue.put(None)
+            for writer in writers:
+                writer.join()
+        
+        if writer_errors:
+            raise writer_errors[0]
+
+    def _saved_checkpoint_map(self) -> Dict[str, Dict]:
+        """Checkpoints de la ejecución anterior (vacío si no se está reanudando)"""
+        if not self.config.get("resume", False) or self.checkpoints is None:
+            return {}
+        with self._checkpoint_lock:
+            if self._saved_checkpoints is None:
+                self._saved_checkpoints = self.checkpoints.load()
+        return self._saved_checkpoints
+
+    def has_checkpoint(self, table_config: Dict) -> bool:
+        """Indica si la tabla (o rango) ya avanzó en una ejecución anterior"""
+        return self._stats_key(table_config) in self._saved_checkpoint_map()
+
+    def _load_checkpoint(self, table_config: Dict) -> Optional[Dict]:
+        """Checkpoint de la ejecución anterior para la tabla (solo al reanudar)"""
+        table_name = self._stats_key(table_config)
+        checkpoint = self._saved_checkpoint_map().get(table_name)
+        if checkpoint and checkpoint.get("partition_range") != table_config.get("partition_range"):
+            # Los límites de los rangos cambiaron desde la ejecución anterior
+            logger.warning(f"Tabla {table_name}: el rango cambió, se ignora el checkpoint")
+            with self._stats_lock:
+                self.stats["warnings"].append({
+                    "table": table_name,
+                    "chunk": checkpoint.get("chunk_index"),
+                    "error": {"message": "Checkpoint ignorado: el rango de la partición cambió"}
+                })
+            return None
+        return checkpoint
+
+    def _save_checkpoint(self, table_config: Dict, strategy: str, status: str = "PROCESSING"):
+        """Persiste la marca de agua actual de la tabla"""
+        table_name = self._stats_key(table_config)
+        watermark = self._watermarks.get(table_name)
+        if self.checkpoints is None or watermark is None:
+            return
+        position = watermark.position or {}
+        self.checkpoints.save(
+            table_name, strategy, position, watermark.next_index, position.get("rows", 0),
+            status=status, partition_range=table_config.get("partition_range")
+        )
+        watermark.saved_index = watermark.next_index
+
+    def _chunk_done(self, table_config: Dict, table_stats: Dict, chunk_index: int, position: Optional[Dict]):
+        """Avanza la marca de agua y guarda checkpoint cada checkpoint_interval chunks"""
+        watermark = self._watermarks.get(self._stats_key(table_config))
+        if watermark is None or position is None:
+            return
+        interval = self.config.get("checkpoint_interval", 1)
+        # Serializado para que un checkpoint más viejo no sobrescriba uno más nuevo
+        with self._checkpoint_lock:
+            if watermark.complete(chunk_index, position) is None:
+                return
+            if interval and watermark.next_index - watermark.saved_index >= interval:
+                self._save_checkpoint(table_config, table_stats.get("chunking_strategy", "offset"))
+
+    def get_target_column_types(self, target_table: str) -> Dict[str, Tuple]:
+        """Obtener tipos de columnas de la tabla destino (caché de esquemas)"""
+        schema = self.get_table_schema(target_table, self.target_engine)
+        return column_types(schema) if schema is not None else {}
+
+    def _fast_insert_available(self) -> bool:
+        """fast_executemany solo aplica con pyodbc y si el request no lo desactiva"""
+        return (
+            self.config.get("insert_mode", "fast") == "fast"
+            and self.target_engine.dialect.driver == "pyodbc"
+        )
+
+    def _get_insert_plan(self, table_config: Dict, columns: Sequence[str]) -> Dict:
+        """Prepara (una vez por tabla) las consultas INSERT y los tamaños de parámetros"""
+        target_table = table_config.get("target_table") or table_config["source_table"]
+        columns = tuple(columns)
+        plan = self._insert_plans.get(target_table)
+        if plan is not None and plan["columns"] == columns:
+            return plan
+        
+        # Mapeo de columnas aplicado una vez por tabla, no por fila
+        column_mappings = table_config.get("column_mappings") or {}
+        dest_columns = [column_mappings.get(col, col) for col in columns]
+        columns_str = ", ".join(dest_columns)
+        logger.debug(f"Columnas destino para {target_table}: {dest_columns}")
+        # TABLOCK: un solo bloqueo de tabla en lugar de bloqueos por fila/página
+        hint = " WITH (TABLOCK)" if self.config.get("table_lock", False) else ""
+        
+        placeholder = positional_placeholder(self.target_engine.dialect.paramstyle)
+        
+        plan = {
+            "columns": columns,
+            "dest_columns": dest_columns,
+            "insert_query": f"INSERT INTO {target_table}{hint} ({columns_str}) VALUES ({', '.join(placeholder for _ in columns)})",
+            "fast_query": f"INSERT INTO {target_table}{hint} ({columns_str}) VALUES ({', '.join('?' for _ in columns)})",
+            "fast": self._fast_insert_available(),
+            "input_sizes": [],
+        }
+        if plan["fast"]:
+            try:
+                target_types = self.get_target_column_types(target_table)
+                plan["input_sizes"] = build_input_sizes(target_types, dest_columns)
+            except Exception as e:
+                logger.warning(f"No se obtuvieron tipos de {target_table}, pyodbc inferirá tamaños: {str(e)}")
+        
+        self._insert_plans[target_table] = plan
+        return plan
+
+    def insert_chunk_safe(self, table_config: Dict, columns: Sequence[str], chunk_rows: List[tuple],
+                          batch: ChunkBatch) -> str:
+        """Inserta filas (tuplas en el orden de columns) en la transacción abierta del lote, sin confirmar; devuelve el modo utilizado"""
+        if table_config.get("write_mode") == "upsert":
+            return self.upsert_chunk_safe(table_config, columns, chunk_rows)
+        plan = self._get_insert_plan(table_config, columns)
+        raw_conn = batch.connection()
+        fast_error = None
+        
+        # Ruta rápida: tuplas posicionales con fast_executemany
+        if plan["fast"]:
+            try:
+                executemany_insert(raw_conn, plan["fast_query"], chunk_rows, fast=True, input_sizes=plan["input_sizes"])
+                return "fast_executemany"
+            except Exception as e:
+                if len(batch):
+                    # Las filas ya escritas en la transacción no están en memoria para repetirlas
+                    raise
+                fast_error = e
+                logger.warning(f"fast_executemany falló, reintentando chunk con executemany: {str(e)}")
+                batch.rollback()
+                raw_conn = batch.connection()
+        
+        # Ruta de respaldo: executemany del driver con las mismas tuplas posicionales
+        try:
+            executemany_insert(raw_conn, plan["insert_query"], chunk_rows, fast=False)
         except Exception as e:
             logger.error(f"Error insertando chunk: {str(e)}")
             raise
+        
+        if fast_error is not None:
+            # El error era propio de la ruta rápida: no volver a intentarla en esta tabla
+            plan["fast"] = False
+        return "executemany"
+
+    def get_upsert_key(self, table_config: Dict, plan: Dict) -> List[str]:
+        """Columnas destino del MERGE: upsert_key ('A' o 'A,B') o la llave primaria de la tabla destino"""
+        if plan.get("upsert_key"):
+            return plan["upsert_key"]
+        target_table = table_config.get("target_table") or table_config["source_table"]
+        if table_config.get("upsert_key"):
+            key_columns = [key.strip() for key in table_config["upsert_key"].split(",") if key.strip()]
+        else:
+            key_columns = self.get_key_columns(table_config, self.target_engine, target_table)
+        
+        dest_upper = {col.upper() for col in plan["dest_columns"]}
+        if not key_columns or any(key.strip("[]").upper() not in dest_upper for key in key_columns):
+            raise ValueError(
+                f"Tabla {target_table}: upsert requiere upsert_key presente en las columnas transferidas "
+                f"(llave: {key_columns or 'no detectada'})"
+            )
+        plan["upsert_key"] = key_columns
+        return key_columns
+
+    def upsert_chunk_safe(self, table_config: Dict, columns: Sequence[str], chunk_rows: List[tuple]) -> str:
+        """Aplica un chunk con staging + MERGE por lotes de transaction_size; devuelve el modo utilizado"""
+        plan = self._get_insert_plan(table_config, columns)
+        key_columns = self.get_upsert_key(table_config, plan)
+        target_table = table_config.get("target_table") or table_config["source_table"]
+        batch_size = self.config.get("transaction_size", 1000)
+        table_lock = self.config.get("table_lock", False)
+        
+        if plan["fast"]:
+            try:
+                merge_upsert(
+                    self.target_engine, target_table, plan["dest_columns"], key_columns,
+                    chunk_rows, batch_size, fast=True, input_sizes=plan["input_sizes"], table_lock=table_lock
+                )
+                return "merge_fast_executemany"
+            except Exception as e:
+                # Los lotes ya aplicados se repiten sin efecto: MERGE es idempotente
+                logger.warning(f"MERGE con fast_executemany falló, reintentando chunk sin él: {str(e)}")
+                plan["fast"] = False
+        
+        merge_upsert(
+            self.target_engine, target_table, plan["dest_columns"], key_columns,
+            chunk_rows, batch_size, fast=False, table_lock=table_lock
+        )
+        return "merge_executemany"
+
+    def disable_target_indexes(self, table_config: Dict) -> List[str]:
+        """
+        Deshabilita los índices no agrupados y no únicos del destino para la carga masiva.
+        Al reanudar también devuelve los que quedaron deshabilitados por la ejecución interrumpida.
+        """
+        target_table = table_config.get("target_table") or table_config["source_table"]
+        result_data = self.execute_query_safe(self.target_engine, NONCLUSTERED_INDEXES_QUERY, {"table_name": target_table})
+        resuming = self.config.get("resume", False)
+        index_names = [name for name, is_disabled in result_data["rows"] if not is_disabled or resuming]
+        
+        with self.safe_connection(self.target_engine) as conn:
+            for name, is_disabled in result_data["rows"]:
+                if not is_disabled:
+                    conn.execute(text(f"ALTER INDEX [{name}] ON {target_table} DISABLE"))
+        if index_names:
+            logger.info(f"Tabla destino {target_table}: índices deshabilitados para la carga {index_names}")
+        return index_names
+
+    def rebuild_target_indexes(self, table_config: Dict, index_names: List[str]):
+        """Reconstruye los índices deshabilitados; un fallo se reporta sin ocultar el resultado de la carga"""
+        target_table = table_config.get("target_table") or table_config["source_table"]
+        for name in index_names:
+            try:
+                with self.safe_connection(self.target_engine) as conn:
+                    conn.execute(text(f"ALTER INDEX [{name}] ON {target_table} REBUILD"))
+            except Exception as e:
+                logger.error(f"Error reconstruyendo índice {name} de {target_table}: {str(e)}")
+                with self._stats_lock:
+                    self.stats["warnings"].append({
+                        "table": target_table,
+                        "chunk": None,
+                        "error": {"message": f"Índice {name} sigue deshabilitado: {str(e)}"}
+                    })
+        if index_names:
+            logger.info(f"Tabla destino {target_table}: índices reconstruidos {index_names}")
+
+    def truncate_target(self, table_config: Dict):
+        """Vacía la tabla destino; si TRUNCATE no está permitido (llaves foráneas) usa DELETE"""
+        target_table = table_config.get("target_table") or table_config["source_table"]
+        try:
+            with self.safe_connection(self.target_engine) as conn:
+                conn.execute(text(f"TRUNCATE TABLE {target_table}"))
+        except exc.DBAPIError as e:
+            logger.warning(f"TRUNCATE de {target_table} no permitido, usando DELETE: {str(e)}")
+            with self.safe_connection(self.target_engine) as conn:
+                conn.execute(text(f"DELETE FROM {target_table}"))
+        logger.info(f"Tabla destino {target_table} vaciada")
 
     def execute_transfer(self) -> Dict:
         """Ejecuta el proceso completo de transferencia"""
@@ -386,23 +1040,17 @@ class DataTransferWorker:
             logger.info(f"Iniciando transferencia para tarea {self.db_task_id}")
             
             # Conectar bases de datos con verificación
+            if self.status_writer:
+                self.status_writer.start(self.stats["start_time"])
             self.connect_databases()
-            # self.update_db_status_safe("STARTED", 0)
             
             # Ejecutar transferencia para cada tabla
-            for table_config in self.config["tables"]:
-                try:
-                    self.transfer_table_data(table_config)
-                except Exception as e:
-                    if not self.config.get("skip_errors", False):
-                        raise
-                    else:
-                        logger.warning(f"Tabla {table_config['source_table']} omitida: {str(e)}")
+            self._run_tables()
             
             # Finalización exitosa
             self.stats["end_time"] = datetime.now()
             self.stats["status"] = "COMPLETED"
-            # self.update_db_status_safe("SUCCESS", 100)
+            self.finish_status("SUCCESS")
             
             duration = (self.stats["end_time"] - self.stats["start_time"]).total_seconds()
             logger.info(f"Transferencia completada en {duration:.2f}s: {self.stats['transferred_rows']} filas")
@@ -420,7 +1068,7 @@ class DataTransferWorker:
             self.stats["errors"].append({
                 "global_error": error_detail
             })
-            # self.update_db_status_safe("FAILURE", error=error_detail)
+            self.finish_status("FAILURE")
             raise
         
         finally:
@@ -428,60 +1076,145 @@ class DataTransferWorker:
             self.disconnect()
             logger.info("Proceso de transferencia finalizado")
 
-    def update_db_status_safe(self, status: str, progress: Optional[float] = None, error: Optional[Dict] = None):
-        """Actualiza el estado de la tarea en la base de datos con manejo de errores"""
-        try:
-            self.update_db_status(status, progress, error)
-        except Exception as e:
-            logger.error(f"Error actualizando estado en BD: {str(e)}")
-            # No re-lanzar el error para no interrumpir el proceso principal
-
-    def update_db_status(self,status: str, progress: Optional[float] = None, error: Optional[Dict] = None):
-        """Actualiza el estado de la tarea en la base de datos"""
-        #db = get_db#SessionLocal()
-        db= Depends(get_db)
-        try:
-            task = db.query(TaskStatus).get(self.db_task_id)
-            if task:
-                task.status = status
-                if progress is not None:
-                    task.progress = progress
-                task.result = self.stats
-                
-                if status == "FAILURE" and error:
-                    if not task.errors:
-                        task.errors = []
-                    task.errors.append(error)
-                
-                if status == "SUCCESS":
-                    task.end_time = datetime.utcnow()
-                
-                db.commit()
-                logger.debug(f"Estado actualizado en BD: {status}")
-        except Exception as e:
-            logger.error(f"Error actualizando estado en BD: {str(e)}")
-            db.rollback()
-            raise
-        finally:
-            db.close()
+    def _run_tables(self):
+        """Transfiere las tablas del request una tras otra"""
+        self.preload_schemas()
+        for table_config in self.config["tables"]:
+            try:
+                table_config = self.prepare_table(table_config)
+                self.transfer_table_data(table_config)
+                self.commit_sync_watermarks([table_config])
+            except Exception as e:
+                if not self.config.get("skip_errors", False):
+                    raise
+                else:
+                    logger.warning(f"Tabla {table_config['source_table']} omitida: {str(e)}")
 
-    def _update_progress(self):
-        """Actualiza el progreso en la base de datos y en Celery"""
-        # Calcular progreso general
-        progress = (self.stats["completed_tables"] / self.stats["total_tables"]) * 100
+    def prepare_table(self, table_config: Dict) -> Dict:
+        """
+        Modo incremental: filtra las filas posteriores a la marca de agua guardada y hasta
+        el MAX actual de la columna (fijado antes de copiar, así lo que cambie durante la
+        corrida entra en la siguiente).
+        """
+        if table_config.get("sync_mode", "full") != "incremental" or table_config.get("sync_watermark"):
+            return table_config
         
-        # Actualizar base de datos de forma segura
-        # self.update_db_status_safe("PROGRESS", progress)
+        table_name = table_config["source_table"]
+        column = table_config.get("watermark_column")
+        if not column:
+            raise ValueError(f"Tabla {table_name}: sync_mode=incremental requiere watermark_column")
+        if table_config.get("write_mode") == "truncate":
+            raise ValueError(f"Tabla {table_name}: sync_mode=incremental no es compatible con write_mode=truncate")
+        if table_config.get("row_limit"):
+            # TOP n corta el rango de la marca: las filas que queden fuera del límite no se copiarían nunca
+            raise ValueError(f"Tabla {table_name}: sync_mode=incremental no es compatible con row_limit")
+        target_table = table_config.get("target_table") or table_name
         
-        # Actualizar estado de Celery
-        try:
-            self.celery_task.update_state(
-                state='PROGRESS',
-                meta={
-                    'progress': progress,
-                    'stats': self.stats,
-                    'current_table': self.current_table,
-                }
-            )
-        except Exception as e:
-            logger.error(f"Error actualizando estado Celery: {str(e)}")
\ No newline at end of file
+        base_query = self.build_select_query({**table_config, "order_by": None, "row_limit": None})
+        high = self.execute_query_safe(
+            self.source_engine, f"SELECT MAX([{column}]) FROM ({base_query}) AS src"
+        )["rows"][0][0]
+        low = self.watermarks.get(table_name, target_table, column)
+        
+        quoted = f"[{column}]"
+        if high is None:
+            # Sin valores en la columna: nada que sincronizar
+            conditions = ["1 = 0"] if low is not None else [f"{quoted} IS NULL"]
+            high_literal = None
+        else:
+            high_literal = sql_literal(high)
+            if low is None:
+                # Primera corrida: copia completa hasta el valor fijado (incluye filas sin fecha)
+                conditions = [f"({quoted} <= {high_literal} OR {quoted} IS NULL)"]
+            else:
+                conditions = [f"{quoted} > {low}", f"{quoted} <= {high_literal}"]
+        
+        if table_config.get("where_clause"):
+            conditions.insert(0, f"({table_config['where_clause']})")
+        
+        logger.info(f"Tabla {table_name}: sincronización incremental de {column} desde {low} hasta {high_literal}")
+        return {
+            **table_config,
+            "where_clause": " AND ".join(conditions),
+            "sync_watermark": {"column": column, "from": low, "to": high_literal},
+        }
+
+    def commit_sync_watermarks(self, table_configs: List[Dict]):
+        """Avanza la marca de agua de cada tabla incremental que terminó sin errores"""
+        committed = set()
+        for table_config in table_configs:
+            table_name = table_config.get("partition_of") or table_config["source_table"]
+            sync_watermark = table_config.get("sync_watermark")
+            if not sync_watermark or sync_watermark["to"] is None or table_name in committed:
+                continue
+            # Los rangos de una tabla distribuida se confirman en el agregado, no en cada subtarea
+            table_stats = self.stats["table_details"].get(table_name)
+            if table_stats is None:
+                continue
+            committed.add(table_name)
+            
+            # Con chunks omitidos (skip_errors) la marca no avanza: se reintentan en la siguiente corrida
+            if table_stats.get("status") != "COMPLETED" or table_stats.get("errors"):
+                logger.warning(f"Tabla {table_name}: marca de agua sin cambios por errores en la corrida")
+                continue
+            try:
+                self.watermarks.save(
+                    table_name, table_config.get("target_table") or table_name, sync_watermark["column"],
+                    sync_watermark["to"], table_stats.get("transferred", 0), self.db_task_id
+                )
+                logger.info(f"Tabla {table_name}: marca de agua {sync_watermark['column']} = {sync_watermark['to']}")
+            except Exception as e:
+                logger.error(f"Error guardando marca de agua de {table_name}: {str(e)}")
+                with self._stats_lock:
+                    self.stats["warnings"].append({
+                        "table": table_name,
+                        "chunk": None,
+                        "error": {"message": f"Marca de agua no guardada: {str(e)}"}
+                    })
+
+    def _progress_percent(self) -> float:
+        """Tablas terminadas más la fracción copiada de las tablas en curso (llamar con _stats_lock)"""
+        total_tables = self.stats["total_tables"] or 1
+        done = float(self.stats["completed_tables"])
+        for table_name, details in self.stats["table_details"].items():
+            # Los rangos de una tabla particionada cuentan al combinarse
+            if details.get("status") == "PROCESSING" and "#" not in table_name and details.get("total_rows"):
+                done += min(details.get("transferred", 0) / details["total_rows"], 1.0)
+        return round(min(done / total_tables * 100, 100.0), 2)
+
+    def _progress_snapshot(self) -> Dict[str, Any]:
+        """Resumen compacto del avance para Celery/Redis"""
+        with self._stats_lock:
+            return {
+                "progress": self._progress_percent(),
+                "current_table": self.current_table,
+                "completed_tables": self.stats["completed_tables"],
+                "total_tables": self.stats["total_tables"],
+                "total_rows": self.stats["total_rows"],
+                "transferred_rows": self.stats["transferred_rows"],
+                "error_count": len(self.stats["errors"]),
+                "warning_count": len(self.stats["warnings"]),
+                "tables": compact_table_status(self.stats["table_details"]),
+            }
+
+    def _flush_progress(self, meta: Dict[str, Any]):
+        """Destinos del progreso publicado: task_status (con su propio ritmo) y pub/sub del stream"""
+        if self.unit_progress:
+            self.unit_progress.report(meta)
+        if self.status_writer:
+            self.status_writer.progress(meta)
+        if self.publisher:
+            self.publisher.progress(meta)
+
+    def finish_status(self, status: str):
+        """Estado final en task_status y aviso de cierre a los streams suscritos"""
+        if self.status_writer:
+            self.status_writer.finish(status, self.stats)
+            if self.publisher:
+                self.publisher.finished(status, self.stats)
+
+    def _update_progress(self, force: bool = False):
+        """Informa el progreso a Celery; el reporter descarta las actualizaciones demasiado frecuentes"""
+        with self._stats_lock:
+            progress = self._progress_percent()
+        self.progress.report(progress, self._progress_snapshot, force=force)
@@ -0,0 +1,82 @@
+# app/worker/progress.py
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Campos de table_details que viajan en cada actualización de progreso
+COMPACT_TABLE_FIELDS = ("status", "total_rows", "transferred", "errors")
+
+
+def compact_table_status(table_details: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Solo contadores y estado por tabla: sin fechas, warnings ni historial de chunks"""
+    return {
+        table_name: {field: details.get(field) for field in COMPACT_TABLE_FIELDS}
+        for table_name, details in table_details.items()
+    }
+
+
+class ProgressReporter:
+    """
+    Agrupa las actualizaciones de progreso: publica en Celery como máximo una vez cada
+    min_interval segundos, salvo que el avance cambie min_delta puntos o se fuerce
+    (tabla terminada). on_flush recibe el mismo resumen para persistirlo con igual cadencia.
+    """
+
+    def __init__(self, celery_task: Any, min_interval: float = 2.0, min_delta: float = 5.0,
+                 on_flush: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.celery_task = celery_task
+        self.min_interval = min_interval
+        self.min_delta = min_delta
+        self.on_flush = on_flush
+        self.sent = 0
+        self.skipped = 0
+        self._last_time: Optional[float] = None
+        self._last_progress = 0.0
+        self._last_tables: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _due(self, progress: float, now: float) -> bool:
+        if self._last_time is None:
+            return True
+        return now - self._last_time >= self.min_interval or progress - self._last_progress >= self.min_delta
+
+    def report(self, progress: float, snapshot: Callable[[], Dict[str, Any]], force: bool = False) -> bool:
+        """
+        Publica si corresponde. snapshot() arma el resumen solo cuando se va a enviar;
+        devuelve True si se publicó.
+        """
+        # Sin forzar, un hilo que encuentra otro publicando no espera: su avance va en el siguiente envío
+        if not self._lock.acquire(blocking=force):
+            self.skipped += 1
+            return False
+        try:
+            now = time.monotonic()
+            if not force and not self._due(progress, now):
+                self.skipped += 1
+                return False
+
+            meta = snapshot()
+            tables = meta.get("tables", {})
+            # Tablas que cambiaron desde el envío anterior (para consumidores incrementales)
+            meta["changed_tables"] = [name for name, status in tables.items() if self._last_tables.get(name) != status]
+            meta["seq"] = self.sent + 1
+            try:
+                self.celery_task.update_state(state="PROGRESS", meta=meta)
+            except Exception as e:
+                logger.error(f"Error actualizando estado Celery: {str(e)}")
+            if self.on_flush is not None:
+                try:
+                    self.on_flush(meta)
+                except Exception as e:
+                    logger.error(f"Error persistiendo progreso: {str(e)}")
+
+            self.sent += 1
+            self._last_time = now
+            self._last_progress = progress
+            self._last_tables = tables
+            return True
+        finally:
+            self._lock.release()
@@ -0,0 +1,64 @@
+# app/worker/progress_events.py
+import json
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+import redis
+
+from app.core.config import settings
+from app.utils.helpers import to_jsonable
+
+logger = logging.getLogger(__name__)
+
+_client: Optional[redis.Redis] = None
+_client_lock = threading.Lock()
+
+
+def progress_channel(db_task_id: int) -> str:
+    """Canal pub/sub de una transferencia (el mismo para todas sus subtareas)"""
+    return f"transfer_progress:{db_task_id}"
+
+
+def get_redis() -> redis.Redis:
+    """Cliente Redis del proceso (redis-py recrea las conexiones tras un fork)"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = redis.Redis.from_url(settings.REDIS_URL, socket_timeout=2, socket_connect_timeout=2)
+    return _client
+
+
+class ProgressPublisher:
+    """Publica los cambios de progreso de una transferencia para /tasks/{task_id}/stream"""
+
+    def __init__(self, db_task_id: int):
+        self.channel = progress_channel(db_task_id)
+        self._failed = False
+
+    def _publish(self, event: str, payload: Dict[str, Any]):
+        try:
+            get_redis().publish(self.channel, json.dumps({"event": event, **to_jsonable(payload)}))
+            self._failed = False
+        except Exception as e:
+            # Sin suscriptores el progreso sigue en Celery y task_status: se registra una vez por racha
+            if not self._failed:
+                logger.warning(f"No se pudo publicar progreso en {self.channel}: {str(e)}")
+            self._failed = True
+
+    def progress(self, meta: Dict[str, Any]):
+        """Delta: contadores generales y solo las tablas que cambiaron desde el envío anterior"""
+        tables = meta.get("tables", {})
+        delta = {key: value for key, value in meta.items() if key not in ("tables", "changed_tables")}
+        delta["tables"] = {name: tables[name] for name in meta.get("changed_tables", []) if name in tables}
+        self._publish("progress", delta)
+
+    def finished(self, status: str, stats: Dict[str, Any]):
+        """Evento final: los suscriptores cierran el stream al recibirlo"""
+        self._publish("finished", {
+            "status": status,
+            "total_rows": stats.get("total_rows"),
+            "transferred_rows": stats.get("transferred_rows"),
+            "error_count": len(stats.get("errors", [])),
+        })
@@ -0,0 +1,33 @@
+# app/worker/row_counts.py
+import logging
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+
+logger = logging.getLogger(__name__)
+
+# Filas del heap (0) o índice agrupado (1) según los metadatos, sin recorrer la tabla
+PARTITION_STATS_ROWS_QUERY = """
+SELECT SUM(row_count) FROM sys.dm_db_partition_stats
+WHERE object_id = OBJECT_ID(:table_name) AND index_id IN (0, 1)
+"""
+
+# Respaldo sin el permiso VIEW DATABASE STATE que requiere la DMV
+PARTITIONS_ROWS_QUERY = """
+SELECT SUM(rows) FROM sys.partitions
+WHERE object_id = OBJECT_ID(:table_name) AND index_id IN (0, 1)
+"""
+
+
+def estimate_table_rows(engine: Engine, table_name: str) -> Optional[int]:
+    """Filas estimadas de una tabla; None si no es una tabla (vista, sinónimo) o no se pudo leer"""
+    for query in (PARTITION_STATS_ROWS_QUERY, PARTITIONS_ROWS_QUERY):
+        try:
+            with engine.connect() as conn:
+                value = conn.execute(text(query), {"table_name": table_name}).scalar()
+            return int(value) if value is not None else None
+        except DBAPIError as e:
+            logger.debug(f"Estimación de filas de {table_name} no disponible: {str(e)}")
+    return None
@@ -0,0 +1,182 @@
+# app/worker/schema_cache.py
+import logging
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# SQL Server admite 2100 parámetros por consulta; los nombres se envían por lotes
+MAX_TABLES_PER_QUERY = 500
+
+# Columnas ('C') y columnas de PK/índices únicos ('K') de varias tablas en un solo viaje.
+# TYPE_NAME(system_type_id) da el tipo base también para tipos de alias.
+SCHEMA_QUERY = """
+WITH requested AS (
+    SELECT v.table_name, OBJECT_ID(v.table_name) AS object_id
+    FROM (VALUES {values}) AS v(table_name)
+)
+SELECT r.table_name, 'C' AS kind, c.column_id AS ordinal, c.name,
+       TYPE_NAME(c.system_type_id) AS data_type, c.max_length, c.precision, c.scale,
+       c.is_nullable, c.is_identity, c.is_computed, NULL AS index_id, NULL AS is_primary_key
+FROM requested r
+INNER JOIN sys.columns c ON c.object_id = r.object_id
+UNION ALL
+SELECT r.table_name, 'K', ic.key_ordinal, c.name,
+       NULL, NULL, NULL, NULL,
+       c.is_nullable, NULL, NULL, i.index_id, i.is_primary_key
+FROM requested r
+INNER JOIN sys.indexes i ON i.object_id = r.object_id
+INNER JOIN sys.index_columns ic ON ic.object_id = i.object_id AND ic.index_id = i.index_id
+INNER JOIN sys.columns c ON c.object_id = ic.object_id AND c.column_id = ic.column_id
+WHERE (i.is_primary_key = 1 OR i.is_unique = 1)
+  AND i.has_filter = 0
+  AND i.is_disabled = 0
+  AND ic.key_ordinal > 0
+ORDER BY 1, 2, 12, 3
+"""
+
+# Tipos con fracción de segundo: sys.columns la guarda en scale
+_DATETIME_SCALE_TYPES = ("datetime2", "datetimeoffset", "time")
+
+
+def table_cache_key(table_name: str) -> str:
+    """Nombre normalizado: sin corchetes ni mayúsculas ('[dbo].[X]' == 'dbo.x')"""
+    return ".".join(part.strip().strip("[]") for part in table_name.split(".")).lower()
+
+
+def _column_length(data_type: str, max_length: Optional[int]) -> Optional[int]:
+    """Longitud en caracteres como INFORMATION_SCHEMA (sys.columns la da en bytes)"""
+    if max_length is None or max_length == -1:
+        return max_length
+    if data_type in ("nvarchar", "nchar"):
+        return max_length // 2
+    if data_type in ("varchar", "char", "varbinary", "binary"):
+        return max_length
+    return None
+
+
+def _build_schema(rows: List[Any]) -> Dict[str, Any]:
+    """Arma la descripción de una tabla a partir de sus filas de SCHEMA_QUERY"""
+    columns: List[Dict[str, Any]] = []
+    key_indexes: Dict[int, Dict[str, Any]] = {}
+    for row in rows:
+        (_, kind, _, name, data_type, max_length, precision, scale,
+         is_nullable, is_identity, is_computed, index_id, is_primary_key) = row
+        if kind == "C":
+            data_type = (data_type or "").lower()
+            columns.append({
+                "name": name,
+                "data_type": data_type,
+                "length": _column_length(data_type, max_length),
+                "precision": precision if data_type in ("decimal", "numeric") else None,
+                "scale": scale if data_type in ("decimal", "numeric") else None,
+                "datetime_precision": scale if data_type in _DATETIME_SCALE_TYPES else None,
+                "is_nullable": bool(is_nullable),
+                "is_identity": bool(is_identity),
+                "is_computed": bool(is_computed),
+            })
+        else:
+            index = key_indexes.setdefault(index_id, {
+                "index_id": index_id, "is_primary_key": bool(is_primary_key), "columns": []
+            })
+            index["columns"].append((name, bool(is_nullable)))
+    return {
+        "columns": columns,
+        # PK primero, después índices únicos por index_id
+        "key_indexes": sorted(key_indexes.values(), key=lambda i: (not i["is_primary_key"], i["index_id"])),
+        "identity_column": next((col["name"] for col in columns if col["is_identity"]), None),
+    }
+
+
+def unique_key_columns(schema: Dict[str, Any]) -> List[str]:
+    """Llave primaria o primer índice único sin columnas NULL (orden total para keyset/MERGE)"""
+    for index in schema["key_indexes"]:
+        if not any(nullable for _, nullable in index["columns"]):
+            return [name for name, _ in index["columns"]]
+    return []
+
+
+def column_types(schema: Dict[str, Any]) -> Dict[str, Tuple]:
+    """Tipos por columna para build_input_sizes: (tipo, longitud, precisión, escala, precisión de fecha)"""
+    return {
+        col["name"]: (col["data_type"], col["length"], col["precision"], col["scale"], col["datetime_precision"])
+        for col in schema["columns"]
+    }
+
+
+class SchemaCache:
+    """
+    Metadatos de tablas (columnas, tipos, PK/índices únicos, identity) por base de datos.
+    Las entradas expiran a los ttl_seconds y se cargan en bloque: una consulta al catálogo
+    por base para todas las tablas de un request.
+    """
+
+    def __init__(self, ttl_seconds: float = 300):
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[Tuple[str, str], Tuple[float, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def _fresh(self, key: Tuple[str, str], now: float) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None or now - entry[0] > self.ttl_seconds:
+            return None
+        return entry[1]
+
+    def load(self, engine: Engine, db_key: str, table_names: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Devuelve el esquema de cada tabla encontrada; consulta solo las que no están vigentes en caché"""
+        now = time.monotonic()
+        result: Dict[str, Dict[str, Any]] = {}
+        missing: List[str] = []
+        with self._lock:
+            for table_name in dict.fromkeys(table_names):
+                schema = self._fresh((db_key, table_cache_key(table_name)), now)
+                if schema is not None:
+                    result[table_name] = schema
+                else:
+                    missing.append(table_name)
+
+        for start in range(0, len(missing), MAX_TABLES_PER_QUERY):
+            batch = missing[start:start + MAX_TABLES_PER_QUERY]
+            values = ", ".join(f"(:t{i})" for i in range(len(batch)))
+            params = {f"t{i}": name for i, name in enumerate(batch)}
+            with engine.connect() as conn:
+                rows = conn.execute(text(SCHEMA_QUERY.format(values=values)), params).fetchall()
+
+            by_table: Dict[str, List[Any]] = {}
+            for row in rows:
+                by_table.setdefault(row[0], []).append(row)
+            loaded_at = time.monotonic()
+            with self._lock:
+                for table_name, table_rows in by_table.items():
+                    schema = _build_schema(table_rows)
+                    self._entries[(db_key, table_cache_key(table_name))] = (loaded_at, schema)
+                    result[table_name] = schema
+            logger.debug(f"Esquema de {len(by_table)}/{len(batch)} tablas cargado de {db_key}")
+        # Las tablas inexistentes no se guardan: pueden crearse antes de la siguiente consulta
+        return result
+
+    def get(self, engine: Engine, db_key: str, table_name: str) -> Optional[Dict[str, Any]]:
+        """Esquema de una tabla (None si no existe en la base)"""
+        return self.load(engine, db_key, [table_name]).get(table_name)
+
+    def invalidate(self, db_key: Optional[str] = None, table_name: Optional[str] = None) -> int:
+        """Descarta entradas de una tabla, de una base o todas; devuelve cuántas se eliminaron"""
+        table_key = table_cache_key(table_name) if table_name else None
+        with self._lock:
+            keys = [
+                key for key in self._entries
+                if (db_key is None or key[0] == db_key) and (table_key is None or key[1] == table_key)
+            ]
+            for key in keys:
+                del self._entries[key]
+        return len(keys)
+
+
+# Caché por proceso, compartida por los workers del mismo proceso (como el registro de engines)
+schema_cache = SchemaCache(ttl_seconds=settings.SCHEMA_CACHE_TTL_SECONDS)
@@ -0,0 +1,90 @@
+# app/worker/task_status.py
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.database import StatusSessionLocal
+from app.models.task import TaskStatus
+from app.utils.helpers import to_jsonable
+
+logger = logging.getLogger(__name__)
+
+
+def format_warnings(warnings: List[Dict]) -> Optional[List[str]]:
+    """Advertencias de chunks como texto para la columna warnings (None si no hay)"""
+    return [
+        f"{warning.get('table')} (chunk {warning.get('chunk')}): {warning.get('error', {}).get('message')}"
+        for warning in warnings
+    ] or None
+
+
+def save_task_status(db_task_id: int, session_factory=StatusSessionLocal, **fields) -> bool:
+    """Actualiza columnas del registro TaskStatus sin interrumpir la transferencia si falla"""
+    db = session_factory()
+    try:
+        task = db.get(TaskStatus, db_task_id)
+        if task is None:
+            return False
+        for field, value in fields.items():
+            setattr(task, field, value)
+        db.commit()
+        return True
+    except Exception as e:
+        logger.error(f"Error actualizando TaskStatus {db_task_id}: {str(e)}")
+        db.rollback()
+        return False
+    finally:
+        db.close()
+
+
+class TaskStatusWriter:
+    """
+    Escribe el estado de una transferencia en task_status desde el worker. Los cambios de
+    progreso se acumulan y se guardan juntos en un solo UPDATE como máximo cada
+    min_interval segundos; inicio y fin se escriben de inmediato.
+    """
+
+    def __init__(self, db_task_id: int, session_factory=StatusSessionLocal,
+                 min_interval: float = settings.STATUS_FLUSH_INTERVAL_SECONDS):
+        self.db_task_id = db_task_id
+        self.session_factory = session_factory
+        self.min_interval = min_interval
+        self._pending: Dict[str, Any] = {}
+        self._last_flush: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def update(self, force: bool = False, **fields):
+        """Acumula columnas a actualizar; las escribe si pasó min_interval o si se fuerza"""
+        with self._lock:
+            self._pending.update(fields)
+            now = time.monotonic()
+            if not force and self._last_flush is not None and now - self._last_flush < self.min_interval:
+                return
+            pending, self._pending = self._pending, {}
+            self._last_flush = now
+            save_task_status(self.db_task_id, self.session_factory, **pending)
+
+    def start(self, start_time: datetime):
+        self.update(force=True, status="STARTED", progress=0.0, start_time=start_time, end_time=None)
+
+    def progress(self, meta: Dict[str, Any]):
+        """Hook on_flush del ProgressReporter: avance y resumen compacto por tabla"""
+        self.update(status="PROGRESS", progress=meta.get("progress"), result=to_jsonable(meta))
+
+    def finish(self, status: str, stats: Dict[str, Any]):
+        """Estado final con las estadísticas completas (descarta progreso pendiente)"""
+        with self._lock:
+            self._pending = {}
+        fields = {
+            "status": status,
+            "result": to_jsonable(stats),
+            "errors": to_jsonable(stats["errors"]) or None,
+            "warnings": format_warnings(stats["warnings"]),
+            "end_time": stats.get("end_time") or datetime.now(),
+        }
+        if status == "SUCCESS":
+            fields["progress"] = 100.0
+        self.update(force=True, **fields)
@@ -0,0 +1,112 @@
+# app/worker/unit_progress.py
+import json
+import logging
+from typing import Any, Dict
+
+from app.core.config import settings
+from app.utils.helpers import to_jsonable
+from app.worker.progress_events import ProgressPublisher, get_redis
+from app.worker.task_status import save_task_status
+
+logger = logging.getLogger(__name__)
+
+# El hash vive lo mismo que una transferencia larga; el agregado lo borra al terminar
+UNITS_TTL_SECONDS = 24 * 3600
+# Una subtarea fallida también está terminada para el avance general
+FINISHED_TABLE_STATUSES = ("COMPLETED", "FAILED")
+
+
+def units_key(db_task_id: int) -> str:
+    """Hash con el último resumen de cada subtarea de una transferencia distribuida"""
+    return f"transfer_units:{db_task_id}"
+
+
+def status_flush_key(db_task_id: int) -> str:
+    return f"transfer_units_flush:{db_task_id}"
+
+
+def clear_unit_progress(db_task_id: int):
+    """Borra el avance de subtareas (antes de repartir y al agregar el resultado)"""
+    try:
+        get_redis().delete(units_key(db_task_id), status_flush_key(db_task_id))
+    except Exception as e:
+        logger.warning(f"No se pudo limpiar el avance de subtareas de {db_task_id}: {str(e)}")
+
+
+def _unit_fraction(meta: Dict[str, Any]) -> float:
+    """Avance 0..1 de una subtarea; por filas mientras copia (las particiones no cuentan en progress)"""
+    tables = meta.get("tables") or {}
+    if tables and all(table.get("status") in FINISHED_TABLE_STATUSES for table in tables.values()):
+        return 1.0
+    total_rows = meta.get("total_rows") or 0
+    if total_rows:
+        return min(meta.get("transferred_rows", 0) / total_rows, 0.99)
+    return 0.0
+
+
+class UnitProgress:
+    """
+    Progreso de una subtarea del chord. Cada subtarea guarda su resumen en un hash de Redis
+    compartido y publica el agregado de todas (promedio sobre total_units, filas sumadas y
+    tablas combinadas), de modo que el stream no salta entre el 0-100% de cada subtarea.
+    task_status recibe el mismo agregado: una sola subtarea lo escribe por intervalo.
+    """
+
+    def __init__(self, db_task_id: int, unit_key: str, total_units: int):
+        self.db_task_id = db_task_id
+        self.unit_key = unit_key
+        self.total_units = max(total_units, 1)
+        self.publisher = ProgressPublisher(db_task_id)
+        self._failed = False
+
+    def _aggregate(self, units: Dict[bytes, bytes]) -> Dict[str, Any]:
+        summaries = [json.loads(value) for value in units.values()]
+        tables: Dict[str, Any] = {}
+        for summary in summaries:
+            tables.update(summary.get("tables", {}))
+        return {
+            "progress": round(sum(summary["fraction"] for summary in summaries) / self.total_units * 100, 2),
+            "completed_units": sum(1 for summary in summaries if summary["fraction"] >= 1.0),
+            "total_units": self.total_units,
+            "total_rows": sum(summary.get("total_rows", 0) for summary in summaries),
+            "transferred_rows": sum(summary.get("transferred_rows", 0) for summary in summaries),
+            "error_count": sum(summary.get("error_count", 0) for summary in summaries),
+            "warning_count": sum(summary.get("warning_count", 0) for summary in summaries),
+            "tables": tables,
+        }
+
+    def report(self, meta: Dict[str, Any]):
+        """Hook on_flush del worker en modo subtarea"""
+        summary = {
+            "fraction": _unit_fraction(meta),
+            "total_rows": meta.get("total_rows", 0),
+            "transferred_rows": meta.get("transferred_rows", 0),
+            "error_count": meta.get("error_count", 0),
+            "warning_count": meta.get("warning_count", 0),
+            "tables": meta.get("tables", {}),
+        }
+        try:
+            client = get_redis()
+            key = units_key(self.db_task_id)
+            pipe = client.pipeline()
+            pipe.hset(key, self.unit_key, json.dumps(to_jsonable(summary)))
+            pipe.expire(key, UNITS_TTL_SECONDS)
+            pipe.hgetall(key)
+            units = pipe.execute()[-1]
+            # Solo la subtarea que obtiene la marca escribe task_status en este intervalo
+            write_status = client.set(status_flush_key(self.db_task_id), 1, nx=True,
+                                      ex=max(int(settings.STATUS_FLUSH_INTERVAL_SECONDS), 1))
+            self._failed = False
+        except Exception as e:
+            # Sin Redis no hay agregado: el resultado final lo escribe el callback del chord
+            if not self._failed:
+                logger.warning(f"No se pudo registrar el avance de la subtarea {self.unit_key}: {str(e)}")
+            self._failed = True
+            return
+
+        aggregate = self._aggregate(units)
+        aggregate["current_table"] = meta.get("current_table")
+        self.publisher.progress({**aggregate, "changed_tables": meta.get("changed_tables", [])})
+        if write_status:
+            save_task_status(self.db_task_id, status="PROGRESS", progress=aggregate["progress"],
+                             result=to_jsonable(aggregate))
@@ -0,0 +1,97 @@
+# app/worker/upsert.py
+import logging
+import re
+from typing import Any, List, Optional, Sequence
+
+from app.worker.bulk_insert import positional_placeholder, split_table_name
+
+logger = logging.getLogger(__name__)
+
+
+def _quote(column: str) -> str:
+    return f"[{column.strip('[]')}]"
+
+
+def staging_table_name(target_table: str) -> str:
+    """Tabla temporal de sesión (#) donde se carga cada lote antes del MERGE"""
+    _, table_name = split_table_name(target_table)
+    return f"#staging_{re.sub(r'[^0-9A-Za-z_]', '_', table_name)}"
+
+
+def build_merge_query(target_table: str, staging_table: str, dest_columns: Sequence[str],
+                      key_columns: Sequence[str], table_lock: bool = False) -> str:
+    """MERGE de la tabla de staging sobre la tabla destino usando la llave de upsert"""
+    keys_upper = {key.strip("[]").upper() for key in key_columns}
+    on_clause = " AND ".join(f"t.{_quote(key)} = s.{_quote(key)}" for key in key_columns)
+    update_columns = [col for col in dest_columns if col.strip("[]").upper() not in keys_upper]
+    columns_str = ", ".join(_quote(col) for col in dest_columns)
+    values_str = ", ".join(f"s.{_quote(col)}" for col in dest_columns)
+
+    hints = "TABLOCK, HOLDLOCK" if table_lock else "HOLDLOCK"
+    query = f"MERGE {target_table} WITH ({hints}) AS t USING {staging_table} AS s ON {on_clause}"
+    if update_columns:
+        set_clause = ", ".join(f"t.{_quote(col)} = s.{_quote(col)}" for col in update_columns)
+        query += f" WHEN MATCHED THEN UPDATE SET {set_clause}"
+    query += f" WHEN NOT MATCHED BY TARGET THEN INSERT ({columns_str}) VALUES ({values_str});"
+    return query
+
+
+def dedupe_by_key(rows: Sequence[tuple], dest_columns: Sequence[str],
+                  key_columns: Sequence[str]) -> List[tuple]:
+    """Deja la última fila de cada llave: MERGE falla si dos filas del origen tocan la misma fila destino"""
+    columns_upper = [col.strip("[]").upper() for col in dest_columns]
+    positions = [columns_upper.index(key.strip("[]").upper()) for key in key_columns]
+    unique = {}
+    for row in rows:
+        unique[tuple(row[pos] for pos in positions)] = row
+    return list(unique.values())
+
+
+def merge_upsert(engine, target_table: str, dest_columns: Sequence[str], key_columns: Sequence[str],
+                 rows: Sequence[tuple], batch_size: int, fast: bool = True,
+                 input_sizes: Optional[List[Any]] = None, table_lock: bool = False) -> int:
+    """
+    Carga las filas en #staging por lotes de batch_size y aplica cada lote con un MERGE.
+    Todo ocurre en una misma conexión (la tabla # es de sesión); cada lote es una transacción.
+    """
+    staging_table = staging_table_name(target_table)
+    columns_str = ", ".join(_quote(col) for col in dest_columns)
+    placeholder = positional_placeholder(engine.dialect.paramstyle)
+    insert_query = f"INSERT INTO {staging_table} ({columns_str}) VALUES ({', '.join(placeholder for _ in dest_columns)})"
+    merge_query = build_merge_query(target_table, staging_table, dest_columns, key_columns, table_lock)
+    drop_query = f"IF OBJECT_ID('tempdb..{staging_table}') IS NOT NULL DROP TABLE {staging_table}"
+
+    rows = dedupe_by_key(rows, dest_columns, key_columns)
+    raw_conn = engine.raw_connection()
+    cursor = raw_conn.cursor()
+    try:
+        cursor.execute(drop_query)
+        # UNION ALL evita que la tabla de staging herede IDENTITY de la tabla destino
+        cursor.execute(
+            f"SELECT TOP 0 {columns_str} INTO {staging_table} FROM {target_table} "
+            f"UNION ALL SELECT TOP 0 {columns_str} FROM {target_table}"
+        )
+        raw_conn.commit()
+
+        if fast:
+            cursor.fast_executemany = True
+            if input_sizes:
+                cursor.setinputsizes(input_sizes)
+        for start in range(0, len(rows), batch_size):
+            cursor.executemany(insert_query, rows[start:start + batch_size])
+            cursor.execute(merge_query)
+            cursor.execute(f"TRUNCATE TABLE {staging_table}")
+            raw_conn.commit()
+        return len(rows)
+    except Exception:
+        raw_conn.rollback()
+        raise
+    finally:
+        try:
+            # La conexión vuelve al pool: la tabla # no debe sobrevivir a la operación
+            cursor.execute(drop_query)
+            raw_conn.commit()
+        except Exception as e:
+            logger.warning(f"No se pudo eliminar {staging_table}: {str(e)}")
+        cursor.close()
+        raw_conn.close()
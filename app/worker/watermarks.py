@@ -0,0 +1,72 @@
+# app/worker/watermarks.py
+import logging
+from typing import Dict, Optional
+
+from app.core.database import SessionLocal, ensure_table
+from app.models.task import SyncWatermark
+
+logger = logging.getLogger(__name__)
+
+
+def database_key(db_config: Dict) -> str:
+    """Identifica una base de datos como servidor:puerto/base"""
+    return f"{db_config['server']}:{db_config.get('port', 1433)}/{db_config['database']}".lower()
+
+
+class WatermarkStore:
+    """Lee y guarda la marca de agua de cada tabla sincronizada en modo incremental"""
+
+    def __init__(self, source: Dict, target: Dict, session_factory=SessionLocal):
+        self.source_key = database_key(source)
+        self.target_key = database_key(target)
+        self.session_factory = session_factory
+
+    def _query(self, db, source_table: str, target_table: str):
+        return db.query(SyncWatermark).filter(
+            SyncWatermark.source_key == self.source_key,
+            SyncWatermark.target_key == self.target_key,
+            SyncWatermark.source_table == source_table,
+            SyncWatermark.target_table == target_table
+        )
+
+    def get(self, source_table: str, target_table: str, watermark_column: str) -> Optional[str]:
+        """Último valor aplicado; None si es la primera corrida o cambió la columna"""
+        db = self.session_factory()
+        try:
+            ensure_table(SyncWatermark, db.get_bind())
+            watermark = self._query(db, source_table, target_table).first()
+            if watermark is None:
+                return None
+            if watermark.watermark_column.upper() != watermark_column.upper():
+                logger.warning(
+                    f"{source_table}: la marca de agua era de {watermark.watermark_column}, "
+                    f"se sincroniza completa con {watermark_column}"
+                )
+                return None
+            return watermark.last_value
+        finally:
+            db.close()
+
+    def save(self, source_table: str, target_table: str, watermark_column: str, last_value: str,
+             row_count: int, task_id: Optional[int] = None):
+        """Guarda el nuevo valor tras una corrida sin errores"""
+        db = self.session_factory()
+        try:
+            ensure_table(SyncWatermark, db.get_bind())
+            watermark = self._query(db, source_table, target_table).first()
+            if watermark is None:
+                watermark = SyncWatermark(
+                    source_key=self.source_key, target_key=self.target_key,
+                    source_table=source_table, target_table=target_table
+                )
+                db.add(watermark)
+            watermark.watermark_column = watermark_column
+            watermark.last_value = last_value
+            watermark.row_count = row_count
+            watermark.task_id = task_id
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+"""
+Benchmark de inserción del worker: fast_executemany vs executemany con diccionarios.
+
+Copia N filas reales de una tabla a una tabla temporal de trabajo (bench_<tabla>)
+con ambas rutas de DataTransferWorker.insert_chunk_safe y reporta filas/seg en JSON.
+
+Uso:
+    python -m benchmarks.bulk_insert_benchmark --table SPartes --rows 20000 --chunk-size 1000
+
+La conexión se toma de SQL_SERVER/SQL_DATABASE/SQL_USER/SQL_PASSWORD (.env) o de los argumentos.
+"""
+import argparse
+import json
+import time
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.database import create_unified_engine
+from app.worker.database_worker import DataTransferWorker
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark fast_executemany vs executemany")
+    parser.add_argument("--table", default="SPartes", help="Tabla origen de las filas de prueba")
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--server", default=settings.SQL_SERVER)
+    parser.add_argument("--port", type=int, default=1433)
+    parser.add_argument("--database", default=settings.SQL_DATABASE)
+    parser.add_argument("--username", default=settings.SQL_USER)
+    parser.add_argument("--password", default=settings.SQL_PASSWORD)
+    return parser.parse_args()
+
+
+def insertable_columns(engine, table: str):
+    """Columnas que admiten valores explícitos (sin IDENTITY ni calculadas)"""
+    with engine.connect() as conn:
+        result = conn.execute(text(
+            "SELECT name FROM sys.columns "
+            "WHERE object_id = OBJECT_ID(:table) AND is_identity = 0 AND is_computed = 0 "
+            "ORDER BY column_id"
+        ), {"table": table})
+        return [row[0] for row in result]
+
+
+def run_mode(engine, mode: str, bench_table: str, columns, rows, chunk_size: int) -> dict:
+    """Inserta todas las filas con el modo indicado y mide el rendimiento"""
+    with engine.begin() as conn:
+        conn.execute(text(f"TRUNCATE TABLE {bench_table}"))
+
+    worker = DataTransferWorker({"tables": [], "insert_mode": mode}, 0, None)
+    worker.target_engine = engine
+    table_config = {"source_table": bench_table, "target_table": bench_table}
+
+    used_modes = set()
+    start = time.perf_counter()
+    for offset in range(0, len(rows), chunk_size):
+        used_modes.add(worker.insert_chunk_safe(table_config, columns, rows[offset:offset + chunk_size]))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "requested_mode": mode,
+        "used_modes": sorted(used_modes),
+        "rows": len(rows),
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(len(rows) / elapsed, 1) if elapsed > 0 else None,
+    }
+
+
+def main():
+    args = parse_args()
+    engine = create_unified_engine({
+        "server": args.server,
+        "port": args.port,
+        "database": args.database,
+        "username": args.username,
+        "password": args.password,
+    })
+    bench_table = f"bench_{args.table}"
+    columns = insertable_columns(engine, args.table)
+    columns_str = ", ".join(f"[{col}]" for col in columns)
+
+    try:
+        with engine.begin() as conn:
+            conn.execute(text(f"IF OBJECT_ID('{bench_table}') IS NOT NULL DROP TABLE {bench_table}"))
+            conn.execute(text(f"SELECT TOP 0 {columns_str} INTO {bench_table} FROM {args.table}"))
+            rows = list(map(tuple, conn.execute(text(f"SELECT TOP ({args.rows}) {columns_str} FROM {args.table}"))))
+
+        results = [
+            run_mode(engine, mode, bench_table, columns, rows, args.chunk_size)
+            for mode in ("executemany", "fast")
+        ]
+        baseline, fast = results
+        speedup = (
+            fast["rows_per_sec"] / baseline["rows_per_sec"]
+            if fast["rows_per_sec"] and baseline["rows_per_sec"] else None
+        )
+        print(json.dumps({
+            "table": args.table,
+            "columns": len(columns),
+            "chunk_size": args.chunk_size,
+            "results": results,
+            "speedup": round(speedup, 2) if speedup else None,
+        }, indent=2))
+    finally:
+        with engine.begin() as conn:
+            conn.execute(text(f"IF OBJECT_ID('{bench_table}') IS NOT NULL DROP TABLE {bench_table}"))
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()